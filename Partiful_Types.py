@@ -1,8 +1,13 @@
 from pydantic import BaseModel, Field, field_serializer, field_validator
-from typing import Any, List, Union
+from typing import Any, Dict, Iterator, List, Union
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from collections import namedtuple
+import csv
+import io
+import logging
+import re
+import sys
 
 partiful_profile = namedtuple('PartifulProfile', ['name', 'user_id'])
 
@@ -81,9 +86,6 @@ class Data(BaseModel):
 
 
 
-class RequestBody(BaseModel):
-    data: Data
-
 class GetMutualsParams(BaseModel):
     shouldRemoveEventData: bool = False
 
@@ -91,13 +93,134 @@ class GetMutualsParams(BaseModel):
 
 class Paging(BaseModel):
     maxResults: int = 8
-    cursor: str = None
+    cursor: Union[str, None] = None
 
 
 class GetMutualsData(BaseModel):
     params: GetMutualsParams
     paging: Paging
     userId: str
+
+
+class RequestBody(BaseModel):
+    data: Union[Data, GetMutualsData]
+
+
+def warm_models() -> int:
+    """
+    Finish building every request model's validator and serializer, and run the
+    create_event and get_mutuals request shapes through them once, so a fresh worker's
+    first real request doesn't pay for it. Returns the number of models warmed.
+    """
+    models = [obj for obj in globals().values()
+              if isinstance(obj, type) and issubclass(obj, BaseModel) and obj.__module__ == __name__]
+    for model in models:
+        model.model_rebuild()
+    start = datetime(2000, 1, 1, tzinfo=ZoneInfo('UTC'))
+    RequestBody(data=Data(params=CreateEventParams(event=Event(start_date_utc=start, end_date_utc=start)),
+                          userId='warmup')).model_dump_json()
+    RequestBody(data=GetMutualsData(params=GetMutualsParams(), paging=Paging(), userId='warmup')).model_dump_json()
+    RequestBody(data=Data(params={}, userId='warmup')).model_dump_json()
+    return len(models)
+
+
+# Compact records for high-volume results (mutuals, RSVPs, guest exports).
+# namedtuples carry no per-instance __dict__, and repeated values such as
+# statuses and timezones are interned so 100k records share one string each.
+MutualRecord = namedtuple('MutualRecord', ['user_id', 'name'])
+RsvpRecord = namedtuple('RsvpRecord', ['event_id', 'title', 'status', 'start_date', 'timezone'])
+GuestRecord = namedtuple('GuestRecord', ['guest_id', 'name', 'status', 'rsvp_date'])
+
+# CSV header (lowercased, alphanumerics only) -> GuestRecord field
+GUEST_CSV_COLUMNS = {
+    'guest_id': ('userid', 'guestid', 'id', 'phonenumber', 'phone'),
+    'name': ('name', 'guestname', 'fullname'),
+    'status': ('status', 'rsvpstatus', 'rsvp'),
+    'rsvp_date': ('rsvpdate', 'respondedat', 'updatedat', 'date'),
+}
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _result_items(response: Dict[str, Any]) -> List[Any]:
+    return (response.get('result') or {}).get('data') or []
+
+
+def mutual_records(response: Dict[str, Any]) -> Iterator[MutualRecord]:
+    """Convert a getMutuals response (entries may be ids or user dicts) into MutualRecords, skipping entries without an id."""
+    for entry in _result_items(response):
+        if isinstance(entry, str):
+            yield MutualRecord(entry, None)
+        elif isinstance(entry, dict):
+            user = entry.get('user') if isinstance(entry.get('user'), dict) else entry
+            user_id = user.get('id') or user.get('userId') or user.get('uid')
+            if user_id:
+                yield MutualRecord(user_id, user.get('name'))
+
+
+def next_cursor(response: Dict[str, Any]) -> Any:
+    """Cursor of the next page of a paged response (e.g. getMutuals), or None on the last page."""
+    result = response.get('result') or {}
+    paging = result.get('paging') if isinstance(result.get('paging'), dict) else {}
+    return paging.get('cursor') or paging.get('nextCursor') or result.get('cursor') or result.get('nextCursor')
+
+
+def rsvp_records(response: Dict[str, Any]) -> Iterator[RsvpRecord]:
+    """Convert a getMyRsvps response into RsvpRecords."""
+    for entry in _result_items(response):
+        event = entry.get('event') if isinstance(entry.get('event'), dict) else entry
+        guest = entry.get('guest') if isinstance(entry.get('guest'), dict) else entry
+        yield RsvpRecord(event.get('id') or event.get('eventId'),
+                         event.get('title'),
+                         _intern(guest.get('status')),
+                         event.get('startDate'),
+                         _intern(event.get('timezone')))
+
+
+def guest_records(csv_text: str) -> Iterator[GuestRecord]:
+    """Convert get_guests_csv output into GuestRecords, matching columns by header name."""
+    reader = csv.reader(io.StringIO(csv_text))
+    header = next(reader, None)
+    if header is None:
+        return
+    normalized = [re.sub(r'[^a-z0-9]', '', column.lower()) for column in header]
+    positions = {}
+    for field, candidates in GUEST_CSV_COLUMNS.items():
+        positions[field] = next((normalized.index(c) for c in candidates if c in normalized), None)
+
+    def cell(row, field):
+        position = positions[field]
+        return row[position] if position is not None and position < len(row) else None
+
+    for row in reader:
+        if not row:
+            continue
+        yield GuestRecord(cell(row, 'guest_id') or None,
+                          cell(row, 'name'),
+                          _intern(cell(row, 'status')),
+                          cell(row, 'rsvp_date'))
+
+
+def identified_guest_records(csv_text: str) -> Iterator[GuestRecord]:
+    """
+    guest_records for callers that key guests by id. Rows without an id are skipped
+    with a warning; an export where no guest has an id (no id/phone column) raises
+    ValueError, since guests sharing a name could not be told apart.
+    """
+    rows = skipped = 0
+    for record in guest_records(csv_text):
+        rows += 1
+        if record.guest_id is None:
+            skipped += 1
+            continue
+        yield record
+    if rows and skipped == rows:
+        raise ValueError("Guest export has no id or phone column - guests can't be told apart")
+    if skipped:
+        logging.warning(f"Skipped {skipped} of {rows} guests without an id or phone number")
+
 # Example of creating an instance of the RequestBody with defaults
 # request_body = RequestBody(
 #     data=Data(
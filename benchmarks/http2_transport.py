@@ -0,0 +1,113 @@
+"""
+Benchmark PartifulAPI.call_api over HTTP/1.1 (requests) vs HTTP/2 (httpx + h2)
+against a local TLS stub server, under many concurrent requests.
+
+Needs hypercorn and openssl on top of requirements.txt:
+    pip install hypercorn
+    python benchmarks/http2_transport.py --requests 500 --concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Process
+from statistics import median
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PORT = 8443
+STUB_LATENCY = 0.02  # seconds the stub "thinks" before answering
+BODY = json.dumps({"result": {"data": "x" * 512}}).encode()
+
+
+async def app(scope, receive, send):
+    """Minimal ASGI endpoint standing in for api.partiful.com."""
+    if scope["type"] != "http":
+        return
+    while (await receive()).get("more_body"):
+        pass
+    await asyncio.sleep(STUB_LATENCY)
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": BODY})
+
+
+def serve(certfile: str, keyfile: str):
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config
+    config = Config()
+    config.bind = [f"127.0.0.1:{PORT}"]
+    config.certfile = certfile
+    config.keyfile = keyfile
+    config.alpn_protocols = ["h2", "http/1.1"]
+    config.backlog = 1024
+    config.loglevel = "WARNING"
+    asyncio.run(hypercorn_serve(app, config))
+
+
+def make_cert(directory: str):
+    certfile, keyfile = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+                    "-keyout", keyfile, "-out", certfile],
+                   check=True, capture_output=True)
+    return certfile, keyfile
+
+
+def run(api, n_requests: int, concurrency: int):
+    from Partiful_Types import RequestBody, Data
+    url = f"https://localhost:{PORT}/getMutuals"
+    model = RequestBody(data=Data(params={}, userId="bench_user"))
+    latencies = []
+
+    def one(_):
+        start = time.perf_counter()
+        api.call_api(url, method="POST", model=model)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(n_requests)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "wall_s": round(wall, 3),
+        "req_per_s": round(n_requests / wall, 1),
+        "p50_ms": round(median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    from partiful_api import PartifulAPI
+
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile, keyfile = make_cert(tmp)
+        os.environ["REQUESTS_CA_BUNDLE"] = certfile  # trusted by requests
+        os.environ["SSL_CERT_FILE"] = certfile  # trusted by httpx
+        server = Process(target=serve, args=(certfile, keyfile), daemon=True)
+        server.start()
+        time.sleep(1.5)
+        try:
+            profile = MagicMock(user_id="bench_user")
+            for label, http2 in (("HTTP/1.1 (requests)", False), ("HTTP/2 (httpx+h2)", True)):
+                api = PartifulAPI(default_profile=profile, auth_token="bench", http2=http2)
+                with api:
+                    print(label, run(api, args.requests, args.concurrency))
+        finally:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    main()
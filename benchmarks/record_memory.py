@@ -0,0 +1,64 @@
+"""
+Memory used to hold guest export rows as dicts vs pydantic models vs the compact
+GuestRecord namedtuples in Partiful_Types, measured with tracemalloc.
+
+    python benchmarks/record_memory.py --records 100000
+"""
+import argparse
+import csv
+import gc
+import io
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel
+from Partiful_Types import guest_records
+
+STATUSES = ['GOING', 'MAYBE', 'WAITLIST', 'DECLINED', 'PENDING_APPROVAL', 'APPROVED']
+
+
+class GuestModel(BaseModel):
+    guest_id: str
+    name: str
+    status: str
+    rsvp_date: str
+
+
+def make_csv(n: int) -> str:
+    rows = ["Name,Status,RSVP Date,User Id"]
+    rows += [f"Guest {i},{STATUSES[i % len(STATUSES)]},2025-05-{i % 28 + 1:02d},user_{i:08d}" for i in range(n)]
+    return "\n".join(rows) + "\n"
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    records = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100_000)
+    args = parser.parse_args()
+    csv_text = make_csv(args.records)
+
+    results = {
+        "dict": measure(lambda: list(csv.DictReader(io.StringIO(csv_text)))),
+        "pydantic": measure(lambda: [GuestModel(guest_id=row["User Id"], name=row["Name"], status=row["Status"],
+                                                rsvp_date=row["RSVP Date"])
+                                     for row in csv.DictReader(io.StringIO(csv_text))]),
+        "GuestRecord": measure(lambda: list(guest_records(csv_text))),
+    }
+    for label, size in results.items():
+        print(f"{label:>12}: {size / 2**20:7.1f} MiB  ({size / args.records:.0f} B/record)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark first-request latency of a freshly started worker, cold vs after warmup(),
+against the local TLS stub from http2_transport.py.
+
+Every trial runs in a new interpreter, so imports, ZoneInfo, pydantic and the TLS
+handshake are genuinely cold. "first_ms" is the first get_mutuals call, the latency a
+request handler sees. "second_ms" is the next call, for reference.
+
+Needs hypercorn and openssl on top of requirements.txt:
+    pip install hypercorn
+    python benchmarks/warmup.py --trials 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import Process
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from http2_transport import PORT, make_cert, serve  # noqa: E402
+
+STUB_URL = f"https://localhost:{PORT}/"
+
+
+def child(mode: str, http2: bool):
+    """One cold worker: build a client, optionally warm it, time its first calls."""
+    start = time.perf_counter()
+    import partiful_api
+    from Partiful_Types import partiful_profile
+    partiful_api.PARTIFUL_API_URL = STUB_URL
+    import_ms = (time.perf_counter() - start) * 1000
+
+    api = partiful_api.PartifulAPI(partiful_profile(name='bench', user_id='bench_user'), 'bench', http2=http2)
+    warmup_ms = None
+    if mode == 'warm':
+        step = time.perf_counter()
+        metrics = api.warmup(base_url=STUB_URL)
+        assert not metrics['errors'], metrics['errors']
+        warmup_ms = (time.perf_counter() - step) * 1000
+    latencies = []
+    for _ in range(2):
+        step = time.perf_counter()
+        api.get_mutuals()
+        latencies.append((time.perf_counter() - step) * 1000)
+    api.close()
+    print(json.dumps({'import_ms': import_ms, 'warmup_ms': warmup_ms,
+                      'first_ms': latencies[0], 'second_ms': latencies[1]}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--child", choices=("cold", "warm"), help=argparse.SUPPRESS)
+    parser.add_argument("--http2", action="store_true")
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.http2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile, keyfile = make_cert(tmp)
+        env = {**os.environ, "REQUESTS_CA_BUNDLE": certfile, "SSL_CERT_FILE": certfile, "PYTHONPATH": ROOT}
+        server = Process(target=serve, args=(certfile, keyfile), daemon=True)
+        server.start()
+        time.sleep(1.5)
+        try:
+            for mode in ("cold", "warm"):
+                runs = []
+                for _ in range(args.trials):
+                    command = [sys.executable, __file__, "--child", mode] + (["--http2"] if args.http2 else [])
+                    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+                    runs.append(json.loads(output.strip().splitlines()[-1]))
+                summary = {key: round(median(run[key] for run in runs), 1)
+                           for key in ('import_ms', 'warmup_ms', 'first_ms', 'second_ms') if runs[0][key] is not None}
+                print(mode, summary)
+        finally:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Record/replay of PartifulAPI traffic for offline load tests and profiling.
+
+Recording wraps the real transport under call_api and appends each interaction
+(method, url, request body, status, content headers, response body, latency and
+start offset) to a gzipped JSONL cassette. The bearer token, and any *token, *secret,
+*password, authorization or authCode values in urls and bodies, are scrubbed on the way in.
+
+Replaying answers call_api from the cassette instead of the network, sleeping for the
+recorded latency divided by speed (speed=0 answers instantly). A request is matched to
+a recording with the same method, url and (scrubbed) body, in recorded order, falling
+back to the next recording of the same method and url when no body matches. drive() re-issues the
+recorded call pattern itself, at the recorded arrival times divided by speed.
+
+Usage:
+    with Cassette("cassettes/mutuals.jsonl.gz").record(api):
+        api.get_mutuals()
+
+    cassette = Cassette("cassettes/mutuals.jsonl.gz")
+    with cassette.replay(api, speed=10, repeat=True):
+        api.get_mutuals()                      # served from the cassette
+    cassette.drive(api, speed=10, concurrency=16)
+"""
+import contextvars
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+from partiful_api import PartifulAPI
+
+SCRUBBED = '***'
+RECORDED_HEADERS = ('Content-Type', 'Content-Encoding')
+_SECRET_FIELDS = re.compile(r'(\b"?(?:[a-z_]*(?:token|secret|password)|authorization|auth_?code)"?\s*[:=]\s*"?)([^"&,}\s]+)',
+                            re.IGNORECASE)
+
+
+def body_hash(body: Any) -> str:
+    """Short digest of a (scrubbed) request body, '' for no body."""
+    if not body:
+        return ''
+    if isinstance(body, str):
+        body = body.encode()
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+class CassetteResponse:
+    """Just enough of a requests/httpx response for call_api."""
+    def __init__(self, interaction: Dict[str, Any]):
+        self.status_code = interaction['status']
+        self.headers = interaction['headers']
+        self.text = interaction['body']
+        self.content = self.text.encode()
+        self.url = interaction['url']
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def __repr__(self):
+        return f"<CassetteResponse [{self.status_code}]>"
+
+
+class _RecordedBody:
+    """Stands in for a pydantic model when re-issuing a recorded request body."""
+    def __init__(self, body: str):
+        self.body = body
+
+    def model_dump_json(self) -> str:
+        return self.body
+
+
+class Cassette:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mode = None
+        self._started = None
+        self._file = None
+        self._secrets: List[str] = []
+        self._queues: Dict[tuple, deque] = {}  # (method, url) and (method, url, body hash) -> recordings
+        self._played: Dict[tuple, deque] = {}  # (method, url) -> recordings already served
+        self._used = set()  # ids of served recordings, skipped when they come up in the other queue
+        self.speed = 1.0
+        self.repeat = False
+
+    def scrub(self, text: str) -> str:
+        if not text:
+            return text
+        for secret in self._secrets:
+            text = text.replace(secret, SCRUBBED)
+        return _SECRET_FIELDS.sub(lambda m: m.group(1) + SCRUBBED, text)
+
+    def load(self) -> List[Dict[str, Any]]:
+        with gzip.open(self.path, 'rt', encoding='utf-8') as cassette_file:
+            return [json.loads(line) for line in cassette_file if line.strip()]
+
+    @contextmanager
+    def record(self, api: PartifulAPI):
+        """Record every call_api interaction made on api inside the block."""
+        self._secrets = [api.auth_token] if api.auth_token else []
+        self._mode, self._started = 'record', time.monotonic()
+        self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+        api.cassette = self
+        try:
+            yield self
+        finally:
+            api.cassette = None
+            self._mode = None
+            self._file.close()
+
+    @contextmanager
+    def replay(self, api: PartifulAPI, speed: float = 1.0, repeat: bool = False):
+        """
+        Serve call_api from the cassette inside the block.
+
+        :param speed: latency divisor; 10 replays 10x faster, 0 answers instantly
+        :param repeat: cycle through recordings instead of failing once they run out
+        """
+        self._secrets = [api.auth_token] if api.auth_token else []
+        self._queues = defaultdict(deque)
+        for interaction in self.load():
+            self._enqueue(interaction)
+        self._played = defaultdict(deque)
+        self._used = set()
+        self.speed, self.repeat = speed, repeat
+        self._mode = 'replay'
+        api.cassette = self
+        try:
+            yield self
+        finally:
+            api.cassette = None
+            self._mode = None
+
+    def send(self, send: Callable, method: str, url: str, body: Any, expires_at: float = None) -> Any:
+        """Called by PartifulAPI._send in place of the real transport while a cassette is active."""
+        if self._mode == 'replay':
+            return self._play(method, url, body)
+        start = time.monotonic()
+        response = send(method, url, body, expires_at)
+        elapsed = time.monotonic() - start
+        request_body = body.decode() if isinstance(body, bytes) else body
+        interaction = {
+            'offset': round(start - self._started, 4),
+            'method': method,
+            'url': self.scrub(url),
+            'request_body': self.scrub(request_body),
+            'status': response.status_code,
+            'headers': {h: response.headers[h] for h in RECORDED_HEADERS if response.headers.get(h)},
+            'body': self.scrub(response.text),
+            'elapsed': round(elapsed, 4),
+        }
+        # bodies are stored decoded, so the recorded encoding no longer applies
+        interaction['headers'].pop('Content-Encoding', None)
+        with self._lock:
+            self._file.write(json.dumps(interaction) + '\n')
+        return response
+
+    def _enqueue(self, interaction: Dict[str, Any]):
+        url_key = (interaction['method'], interaction['url'])
+        self._queues[url_key].append(interaction)
+        self._queues[url_key + (body_hash(interaction['request_body']),)].append(interaction)
+
+    def _next(self, key: tuple):
+        queue = self._queues.get(key)
+        while queue and id(queue[0]) in self._used:
+            queue.popleft()
+        return queue.popleft() if queue else None
+
+    def _play(self, method: str, url: str, body: Any = None) -> CassetteResponse:
+        url_key = (method, self.scrub(url))
+        request_body = body.decode() if isinstance(body, bytes) else body
+        body_key = url_key + (body_hash(self.scrub(request_body)),)
+        with self._lock:
+            interaction = self._next(body_key) or self._next(url_key)
+            if interaction is None and self.repeat and self._played.get(url_key):
+                played, self._played[url_key] = self._played[url_key], deque()
+                for key in [key for key in self._queues if key[:2] == url_key]:
+                    del self._queues[key]
+                for recorded in played:
+                    self._used.discard(id(recorded))
+                    self._enqueue(recorded)
+                interaction = self._next(body_key) or self._next(url_key)
+            if interaction is None:
+                raise LookupError(f"No recorded interaction left for {method} {url}")
+            self._used.add(id(interaction))
+            self._played[url_key].append(interaction)
+        if self.speed:
+            time.sleep(interaction['elapsed'] / self.speed)
+        return CassetteResponse(interaction)
+
+    def drive(self, api: PartifulAPI, speed: float = 1.0, concurrency: int = 8) -> Dict[str, Any]:
+        """
+        Re-issue the recorded requests through api.call_api at their recorded start
+        offsets divided by speed (0 = as fast as possible). Pair with replay() for a
+        fully offline run. Returns call counts, errors and wall time.
+        """
+        interactions = sorted(self.load(), key=lambda i: i['offset'])
+        stats = {'calls': 0, 'errors': 0}
+        stats_lock = threading.Lock()
+
+        def issue(interaction):
+            model = _RecordedBody(interaction['request_body']) if interaction['request_body'] else None
+            expect_json = interaction['headers'].get('Content-Type', '').startswith('application/json')
+            try:
+                api.call_api(interaction['url'], method=interaction['method'], model=model, expect_json=expect_json)
+                failed = False
+            except Exception:
+                failed = True
+            with stats_lock:
+                stats['calls'] += 1
+                stats['errors'] += failed
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for interaction in interactions:
+                if speed:
+                    delay = start + interaction['offset'] / speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                pool.submit(contextvars.copy_context().run, issue, interaction)
+        stats['wall_s'] = round(time.monotonic() - start, 3)
+        return stats
@@ -0,0 +1,192 @@
+import gzip
+import time
+import zlib
+from threading import Lock
+from typing import Dict, List, Union
+from urllib.parse import urlparse
+
+import requests
+from urllib3.exceptions import ProtocolError, ReadTimeoutError, SSLError
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def supported_encodings() -> List[str]:
+    """Content-Encodings we can actually decode with the decoders installed."""
+    encodings = ['gzip', 'deflate']
+    if brotli is not None:
+        encodings.append('br')
+    if zstandard is not None:
+        encodings.append('zstd')
+    return encodings
+
+
+def accept_encoding() -> str:
+    """Value for the Accept-Encoding header, advertising only supported encodings."""
+    return ', '.join(supported_encodings())
+
+
+class _DeflateDecoder:
+    """
+    'deflate' is meant to be zlib-wrapped, but some servers send raw deflate.
+    Detect which one from the first chunk.
+    """
+    def __init__(self):
+        self._obj = None
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if self._obj is None:
+            self._obj = zlib.decompressobj()
+            try:
+                return self._obj.decompress(chunk)
+            except zlib.error:
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._obj.decompress(chunk)
+
+    def flush(self) -> bytes:
+        return self._obj.flush() if self._obj is not None else b''
+
+
+class _BrotliDecoder:
+    def __init__(self):
+        self._obj = brotli.Decompressor()
+
+    def decompress(self, chunk: bytes) -> bytes:
+        return self._obj.process(chunk)
+
+    def flush(self) -> bytes:
+        return b''
+
+
+class StreamDecoder:
+    """
+    Incrementally decode a response body chunk by chunk, so large compressed
+    payloads are never held in memory both compressed and decompressed.
+
+    :param content_encoding: the response's Content-Encoding header, e.g. 'br' or 'gzip, br'
+    """
+    def __init__(self, content_encoding: str = None):
+        encodings = [e.strip().lower() for e in (content_encoding or '').split(',')]
+        # Encodings are listed in the order they were applied, so undo them in reverse
+        self._decoders = [self._make_decoder(e) for e in reversed(encodings) if e and e != 'identity']
+
+    @staticmethod
+    def _make_decoder(encoding: str):
+        if encoding in ('gzip', 'x-gzip'):
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if encoding == 'deflate':
+            return _DeflateDecoder()
+        if encoding == 'br' and brotli is not None:
+            return _BrotliDecoder()
+        if encoding == 'zstd' and zstandard is not None:
+            return zstandard.ZstdDecompressor().decompressobj()
+        raise ValueError(f"Unsupported Content-Encoding '{encoding}' - supported: {supported_encodings()}")
+
+    def decompress(self, chunk: bytes) -> bytes:
+        for decoder in self._decoders:
+            if not chunk:
+                break
+            chunk = decoder.decompress(chunk)
+        return chunk
+
+    def flush(self) -> bytes:
+        out = b''
+        for decoder in self._decoders:
+            if out:
+                out = decoder.decompress(out)
+            out += decoder.flush()
+        return out
+
+
+def read_body(response: requests.Response, chunk_size: int = 64 * 1024, deadline: float = None) -> int:
+    """
+    Read a response opened with stream=True straight off the socket, decoding it
+    with StreamDecoder instead of relying on urllib3. The decoded body is stored on
+    the response so .json()/.text work as usual.
+
+    :param deadline: time.monotonic() value; TimeoutError is raised if the body is still
+        arriving after it
+
+    Read errors are raised as the requests exceptions requests itself would raise (ReadTimeout,
+    ConnectionError, SSLError), since reading raw bypasses its wrapping.
+
+    :return: number of bytes received on the wire (before decoding)
+    """
+    decoder = StreamDecoder(response.headers.get('Content-Encoding'))
+    wire_bytes = 0
+    parts = []
+    try:
+        for chunk in response.raw.stream(chunk_size, decode_content=False):
+            wire_bytes += len(chunk)
+            parts.append(decoder.decompress(chunk))
+            if deadline is not None and time.monotonic() > deadline:
+                response.close()
+                raise TimeoutError("Response body still streaming when the deadline passed")
+    except ReadTimeoutError as e:
+        raise requests.exceptions.ReadTimeout(e, response=response) from e
+    except SSLError as e:
+        raise requests.exceptions.SSLError(e, response=response) from e
+    except ProtocolError as e:
+        raise requests.exceptions.ConnectionError(e, response=response) from e
+    parts.append(decoder.flush())
+    response._content = b''.join(parts)
+    response._content_consumed = True
+    response.raw.release_conn()
+    return wire_bytes
+
+
+def gzip_body(body: bytes) -> bytes:
+    """Gzip a request body."""
+    return gzip.compress(body, compresslevel=6)
+
+
+def endpoint_name(url: str) -> str:
+    """'https://api.partiful.com/getMutuals?x=1' -> 'getMutuals'"""
+    return urlparse(url).path.strip('/') or '/'
+
+
+class CompressionStats:
+    """Thread safe per-endpoint counters of compressed vs uncompressed bytes."""
+    FIELDS = ('requests', 'request_bytes', 'request_bytes_sent', 'response_bytes_wire', 'response_bytes')
+
+    def __init__(self):
+        self._lock = Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _endpoint(self, endpoint: str) -> Dict[str, int]:
+        if endpoint not in self._stats:
+            self._stats[endpoint] = dict.fromkeys(self.FIELDS, 0)
+        return self._stats[endpoint]
+
+    def record_request(self, endpoint: str, uncompressed: int, sent: int):
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats['request_bytes'] += uncompressed
+            stats['request_bytes_sent'] += sent
+
+    def record_response(self, endpoint: str, wire: int, decoded: int):
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats['requests'] += 1
+            stats['response_bytes_wire'] += wire
+            stats['response_bytes'] += decoded
+
+    def snapshot(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """Copy of the counters, with response compression ratio (decoded / wire) per endpoint."""
+        with self._lock:
+            out = {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
+        for stats in out.values():
+            wire = stats['response_bytes_wire']
+            stats['response_ratio'] = round(stats['response_bytes'] / wire, 2) if wire else None
+        return out
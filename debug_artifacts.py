@@ -0,0 +1,120 @@
+"""
+Debug artifacts (screenshots, driver logs) written off the caller's thread.
+
+Artifacts are only kept on failure, or for every call when debug is on
+(ArtifactWriter(debug=True) or PARTIFUL_DEBUG_ARTIFACTS=1). JSON is gzipped; PNGs
+are stored as-is since they are already compressed. After every write the artifact
+directory is pruned to max_count files, max_age_s seconds and max_bytes in total.
+"""
+import gzip
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable
+
+DEBUG_ENV_VAR = 'PARTIFUL_DEBUG_ARTIFACTS'
+
+
+class ArtifactWriter:
+    def __init__(self,
+                 root: str = 'logs',
+                 debug: bool = None,
+                 max_count: int = 50,
+                 max_age_s: float = 7 * 24 * 3600,
+                 max_bytes: int = 200 * 2**20,
+                 ):
+        """
+        :param root: artifacts go in <root>/<kind>/, e.g. logs/screenshots
+        :param debug: keep artifacts from successful runs too. Defaults to the PARTIFUL_DEBUG_ARTIFACTS env var
+        :param max_count: files kept per kind
+        :param max_age_s: files older than this are deleted
+        :param max_bytes: total size kept per kind
+        """
+        self.root = root
+        self.debug = debug if debug is not None else os.environ.get(DEBUG_ENV_VAR, '') not in ('', '0')
+        self.max_count = max_count
+        self.max_age_s = max_age_s
+        self.max_bytes = max_bytes
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._counter = itertools.count(1)
+
+    def wants(self, failure: bool = False) -> bool:
+        """Whether an artifact would be kept - check before doing expensive capture work."""
+        return failure or self.debug
+
+    def save_bytes(self, kind: str, data: bytes, extension: str, tag: str = '', failure: bool = False) -> bool:
+        """Queue raw bytes (e.g. a PNG screenshot). Returns False if the artifact was not wanted."""
+        if not self.wants(failure):
+            return False
+        self._submit(kind, extension, tag, lambda: data)
+        return True
+
+    def save_json(self, kind: str, payload: Any, tag: str = '', failure: bool = False) -> bool:
+        """Queue a JSON-serialisable payload; it is serialised and gzipped on the writer thread."""
+        if not self.wants(failure):
+            return False
+        self._submit(kind, '.json.gz', tag, lambda: gzip.compress(json.dumps(payload, default=str).encode(), compresslevel=6))
+        return True
+
+    def _submit(self, kind: str, extension: str, tag: str, render: Callable[[], bytes]):
+        name = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{next(self._counter)}{'_' + tag if tag else ''}{extension}"
+        self._ensure_thread()
+        self._queue.put((kind, name, render))
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name='artifact-writer', daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            kind, name, render = self._queue.get()
+            try:
+                directory = os.path.join(self.root, kind)
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, name)
+                # written under a temp name so a failed render/write never leaves a partial artifact
+                try:
+                    with open(path + '.tmp', 'wb') as artifact_file:
+                        artifact_file.write(render())
+                    os.replace(path + '.tmp', path)
+                except BaseException:
+                    if os.path.exists(path + '.tmp'):
+                        os.remove(path + '.tmp')
+                    raise
+                self.enforce_retention(directory)
+            except Exception as e:
+                logging.error(f"Failed to write debug artifact {kind}/{name}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def enforce_retention(self, directory: str):
+        """Delete the oldest files in directory until count, age and size limits hold."""
+        files = []
+        for entry in os.scandir(directory):
+            if entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort(reverse=True)  # newest first
+        cutoff = time.time() - self.max_age_s
+        total = 0
+        for index, (mtime, size, path) in enumerate(files):
+            total += size
+            if index >= self.max_count or mtime < cutoff or total > self.max_bytes:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def flush(self):
+        """Block until every queued artifact has been written."""
+        self._queue.join()
@@ -0,0 +1,343 @@
+"""
+Durable outbox for create_event.
+
+submit() appends an event-creation intent to a local append-only JSONL log, fsyncs
+it and returns straight away; a background worker drains pending intents in batches.
+Every state change is another log record, so reopening the outbox after a crash
+rebuilds exactly where it was:
+
+    {"type": "intent", "id": ..., "args": {...}}    accepted from a producer
+    {"type": "attempt", "id": ...}                   about to call create_event for this intent
+    {"type": "done", "id": ..., "url": ...}          event created
+    {"type": "failed", "id": ..., "error": ...}      request provably not accepted, will retry
+    {"type": "in_doubt", "id": ..., "error": ...}    failed in a way the event may still exist
+    {"type": "dead", "id": ..., "error": ...}        gave up
+
+create_event has no idempotency key, so an intent is only retried automatically when
+the failure shows Partiful never accepted the request: it could not connect, the time
+budget ran out before sending, the event failed validation, or Partiful refused it
+with a 4xx status. Anything else (5xx responses, read timeouts, connection resets,
+errors reading the response) is marked in_doubt, as is an intent whose last record is "attempt" after
+a crash, and waits for retry_in_doubt. That is what guarantees a retry never creates
+a duplicate event.
+
+Usage:
+    with EventOutbox(api, "logs/event_outbox.jsonl") as outbox:
+        intent_id = outbox.submit(event_name="Launch", event_date=start, max_capacity=50)
+        url = outbox.wait(intent_id, timeout=30)
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import pydantic
+import requests
+import urllib3
+
+from job_runner import run_job
+from partiful_api import APIError, DeadlineExceeded, PartifulAPI
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+PENDING, IN_FLIGHT, DONE, FAILED, DEAD, IN_DOUBT = 'pending', 'in_flight', 'done', 'failed', 'dead', 'in_doubt'
+
+def never_accepted(error: BaseException) -> bool:
+    """
+    Whether a create_event failure proves Partiful did not create the event: the request
+    was refused with a 4xx status, never got out (budget spent, could not connect), or
+    was never built (the event failed model validation). A 5xx may come after the event
+    was stored, and errors while reading a response came after Partiful answered.
+    """
+    if isinstance(error, APIError):
+        return 400 <= error.status_code < 500
+    if isinstance(error, pydantic.ValidationError):
+        return True
+    if isinstance(error, DeadlineExceeded):
+        if not error.request_sent:
+            return True
+        error = error.__cause__  # the transport timeout it wraps
+    if isinstance(error, (requests.exceptions.ConnectTimeout, requests.exceptions.SSLError)):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, urllib3.exceptions.NewConnectionError)
+    return httpx is not None and isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+
+
+class EventOutbox:
+    def __init__(self,
+                 api: PartifulAPI,
+                 path: str = 'logs/event_outbox.jsonl',
+                 batch_size: int = 10,
+                 poll_interval: float = 1.0,
+                 max_attempts: int = 5,
+                 retry_backoff: float = 2.0,
+                 on_created: Callable[[str, str], None] = None,
+                 ):
+        """
+        :param path: append-only log file; created if missing, replayed if present
+        :param batch_size: intents claimed per worker pass
+        :param poll_interval: seconds the worker idles when there is nothing to send
+        :param max_attempts: create_event failures before an intent is marked dead
+        :param retry_backoff: base seconds of exponential backoff between retries
+        :param on_created: called with (intent_id, event_url) for every created event
+        """
+        self.api = api
+        self.path = path
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.on_created = on_created
+
+        self._intents: Dict[str, Dict[str, Any]] = {}
+        self._order: List[str] = []  # submission order, for FIFO draining
+        self._keys: Dict[str, str] = {}  # idempotency key -> intent id
+        self._claimed = set()  # intents picked by a drain_once pass still running
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._worker = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._replay()
+        self._log = open(path, 'a')
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as log_file:
+            content = log_file.read()
+            complete = content[:content.rfind(b'\n') + 1]
+            if len(complete) != len(content):
+                # drop a torn last write from a crash, so the next append starts on a fresh line
+                log_file.truncate(len(complete))
+        for line in complete.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self._apply(record)
+        for intent_id, intent in self._intents.items():
+            if intent['status'] == IN_FLIGHT:
+                intent['status'] = IN_DOUBT
+                logging.warning(f"Outbox intent {intent_id} was in flight during a crash; marked in_doubt, not retried")
+
+    def _apply(self, record: Dict[str, Any]):
+        kind, intent_id = record['type'], record['id']
+        if kind == 'intent':
+            self._intents[intent_id] = {'status': PENDING, 'args': record['args'], 'key': record.get('key'),
+                                        'attempts': record.get('attempts', 0), 'retry_at': 0.0, 'url': None,
+                                        'error': None}
+            self._order.append(intent_id)
+            if record.get('key'):
+                self._keys[record['key']] = intent_id
+            return
+        intent = self._intents.get(intent_id)
+        if intent is None:
+            return
+        if kind == 'attempt':
+            intent['status'] = IN_FLIGHT
+            intent['attempts'] += 1
+        elif kind == 'done':
+            intent.update(status=DONE, url=record['url'], args=None)
+        elif kind == 'failed':
+            intent.update(status=FAILED, error=record.get('error'),
+                          retry_at=time.time() + self.retry_backoff * 2 ** (intent['attempts'] - 1))
+        elif kind == 'in_doubt':
+            intent.update(status=IN_DOUBT, error=record.get('error'))
+        elif kind == 'dead':
+            intent.update(status=DEAD, error=record.get('error'), args=None)
+        elif kind == 'retry':
+            intent['status'] = PENDING
+
+    def _append(self, records: List[Dict[str, Any]]):
+        """Write records and fsync before they are applied in memory (write-ahead)."""
+        for record in records:
+            self._log.write(json.dumps(record, default=str) + '\n')
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        for record in records:
+            self._apply(record)
+
+    def submit(self,
+               event_name: str,
+               event_date: datetime,
+               max_capacity: int,
+               end_date: datetime = None,
+               description: str = "",
+               cohosts: List[str] = None,
+               idempotency_key: str = None,
+               ) -> str:
+        """
+        Durably record an event to create and return its intent id immediately.
+        Submitting the same idempotency_key again returns the original intent id.
+        """
+        args = {'event_name': event_name, 'event_date': event_date.isoformat(), 'max_capacity': max_capacity,
+                'end_date': end_date.isoformat() if end_date else None, 'description': description,
+                'cohosts': cohosts or []}
+        with self._cond:
+            if idempotency_key is not None and idempotency_key in self._keys:
+                return self._keys[idempotency_key]
+            intent_id = uuid.uuid4().hex
+            self._append([{'type': 'intent', 'id': intent_id, 'key': idempotency_key, 'args': args}])
+            self._cond.notify_all()
+        return intent_id
+
+    def _next_batch(self) -> List[str]:
+        now = time.time()
+        batch = []
+        for intent_id in self._order:
+            intent = self._intents[intent_id]
+            if intent_id in self._claimed:
+                continue
+            if intent['status'] == PENDING or (intent['status'] == FAILED and intent['retry_at'] <= now):
+                batch.append(intent_id)
+                if len(batch) >= self.batch_size:
+                    break
+        return batch
+
+    def drain_once(self) -> int:
+        """Send one batch of due intents. Returns how many were attempted."""
+        with self._cond:
+            batch = self._next_batch()
+            if not batch:
+                return 0
+            self._claimed.update(batch)
+        try:
+            for intent_id in batch:
+                intent = self._intents[intent_id]
+                # Logged per intent right before sending, so a crash leaves only this one in doubt
+                with self._cond:
+                    self._append([{'type': 'attempt', 'id': intent_id}])
+                try:
+                    url = run_job(self.api, {'op': 'create_event', 'args': intent['args']})
+                    record = {'type': 'done', 'id': intent_id, 'url': url}
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    logging.warning(f"Outbox create_event failed for {intent_id} (attempt {intent['attempts']}): {error}")
+                    if not never_accepted(e):
+                        kind = 'in_doubt'
+                    elif intent['attempts'] >= self.max_attempts:
+                        kind = 'dead'
+                    else:
+                        kind = 'failed'
+                    record = {'type': kind, 'id': intent_id, 'error': error}
+                with self._cond:
+                    self._append([record])
+                    self._cond.notify_all()
+                if record['type'] == 'done' and self.on_created:
+                    try:
+                        self.on_created(intent_id, record['url'])
+                    except Exception as e:
+                        logging.error(f"Outbox on_created callback failed for {intent_id}: {e}")
+        finally:
+            with self._cond:
+                self._claimed.difference_update(batch)
+        return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.drain_once() == 0:
+                with self._cond:
+                    self._cond.wait(self.poll_interval)
+
+    def start(self):
+        """Start the background drain worker."""
+        if self._worker is None or not self._worker.is_alive():
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name='event-outbox', daemon=True)
+            self._worker.start()
+
+    def stop(self, timeout: float = None):
+        """Stop the worker after its current batch."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def status(self, intent_id: str) -> str:
+        return self._intents[intent_id]['status']
+
+    def result(self, intent_id: str) -> str:
+        """The created event's URL, or None if it has not been created (yet)."""
+        return self._intents[intent_id]['url']
+
+    def wait(self, intent_id: str, timeout: float = None) -> str:
+        """Block until the intent is created (returns its URL) or dead/in doubt (raises)."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while True:
+                intent = self._intents[intent_id]
+                if intent['status'] == DONE:
+                    return intent['url']
+                if intent['status'] in (DEAD, IN_DOUBT):
+                    raise RuntimeError(f"Outbox intent {intent_id} is {intent['status']}: {intent['error']}")
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"Outbox intent {intent_id} still {intent['status']} after {timeout}s")
+                self._cond.wait(remaining)
+
+    def pending_count(self) -> int:
+        return sum(1 for intent in self._intents.values() if intent['status'] in (PENDING, FAILED, IN_FLIGHT))
+
+    def retry_in_doubt(self, intent_id: str):
+        """Requeue an in_doubt intent once you've checked Partiful that the event was not created."""
+        with self._cond:
+            if self._intents[intent_id]['status'] != IN_DOUBT:
+                raise ValueError(f"Outbox intent {intent_id} is {self._intents[intent_id]['status']}, not in_doubt")
+            self._append([{'type': 'retry', 'id': intent_id}])
+            self._cond.notify_all()
+
+    def compact(self):
+        """
+        Rewrite the log with each intent and its current state, dropping the history
+        that led there. Attempt counts are kept on the intent record, so max_attempts
+        still holds across compactions.
+        """
+        with self._cond:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as tmp:
+                for intent_id in self._order:
+                    intent = self._intents[intent_id]
+                    # an in-flight intent's own attempt record below counts its current attempt
+                    attempts = intent['attempts'] - (intent['status'] == IN_FLIGHT)
+                    tmp.write(json.dumps({'type': 'intent', 'id': intent_id, 'key': intent['key'],
+                                          'args': intent['args'], 'attempts': attempts}) + '\n')
+                    if intent['status'] == DONE:
+                        tmp.write(json.dumps({'type': 'done', 'id': intent_id, 'url': intent['url']}) + '\n')
+                    elif intent['status'] == DEAD:
+                        tmp.write(json.dumps({'type': 'dead', 'id': intent_id, 'error': intent['error']}) + '\n')
+                    elif intent['status'] == IN_DOUBT:
+                        tmp.write(json.dumps({'type': 'in_doubt', 'id': intent_id, 'error': intent['error']}) + '\n')
+                    elif intent['status'] == FAILED:
+                        tmp.write(json.dumps({'type': 'failed', 'id': intent_id, 'error': intent['error']}) + '\n')
+                    elif intent['status'] == IN_FLIGHT:
+                        tmp.write(json.dumps({'type': 'attempt', 'id': intent_id}) + '\n')
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            self._log.close()
+            os.replace(tmp_path, self.path)
+            self._log = open(self.path, 'a')
+
+    def close(self):
+        self.stop()
+        self._log.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,249 @@
+"""
+Recurring event series, created at a steady rate instead of in a burst.
+
+An EventSeries is an RFC 5545 recurrence rule (e.g. "FREQ=WEEKLY;BYDAY=TU;COUNT=52")
+anchored at a local wall-clock start. Occurrences are expanded lazily, in the wall
+time of the API's timezone, so a 7pm weekly event stays at 7pm across DST changes.
+A start that falls in a spring-forward gap is moved forward by the gap. An ambiguous
+fall-back start resolves to its first occurrence.
+
+SeriesScheduler merges any number of series through a heap holding only the next
+occurrence of each series. Occurrences are submitted to create_event in
+(priority, start) order, at `rate` per second or from a shared FileTokenBucket. An
+"attempt" record is appended to a fsynced JSONL log before each create_event call, and
+the outcome after it. Re-running after an interruption continues each series after its
+last logged occurrence. Failed creations are logged, not retried: create_event has no
+idempotency key, so a failure after the request was sent may still have created the
+event (see failed()). For the same reason an attempt with no logged outcome (a crash
+mid-call) is treated as in doubt and never resent (see in_doubt()).
+
+Usage:
+    scheduler = SeriesScheduler(api, "logs/event_series.jsonl", rate=0.5)
+    scheduler.add(EventSeries("run-club", "Run club", "FREQ=WEEKLY;BYDAY=TU;COUNT=52",
+                              first_start=datetime(2025, 3, 4, 19, 0), max_capacity=30,
+                              duration=timedelta(hours=1)))
+    summary = scheduler.run()
+"""
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List
+from zoneinfo import ZoneInfo
+
+from dateutil.rrule import rrulestr
+
+from partiful_api import PartifulAPI
+
+CREATED, FAILED, SKIPPED, ATTEMPT = 'created', 'failed', 'skipped', 'attempt'
+
+EventSpec = namedtuple('EventSpec', ['series_id', 'index', 'priority', 'event_name', 'event_date', 'end_date',
+                                     'max_capacity', 'description', 'cohosts'])
+
+
+def localize(wall_time: datetime, tz: ZoneInfo) -> datetime:
+    """Attach tz to a naive wall time, normalising times in a DST gap forward."""
+    return wall_time.replace(tzinfo=tz).astimezone(timezone.utc).astimezone(tz)
+
+
+class EventSeries:
+    def __init__(self,
+                 series_id: str,
+                 event_name: str,
+                 rule: str,
+                 first_start: datetime,
+                 max_capacity: int,
+                 duration: timedelta = None,
+                 description: str = "",
+                 cohosts: List[str] = None,
+                 priority: int = 0,
+                 ):
+        """
+        :param series_id: stable id, used to resume the series from the scheduler log
+        :param rule: RRULE, e.g. "FREQ=MONTHLY;BYDAY=1FR;UNTIL=20261231T000000" (UNTIL in local time)
+        :param first_start: first occurrence in local wall time (naive, or aware and converted)
+        :param duration: end_date offset from each start, None for no end date
+        :param priority: lower values are submitted first across series
+        """
+        self.series_id = series_id
+        self.event_name = event_name
+        self.rule = rule
+        self.first_start = first_start
+        self.max_capacity = max_capacity
+        self.duration = duration
+        self.description = description
+        self.cohosts = cohosts or []
+        self.priority = priority
+
+    def occurrences(self, tz: ZoneInfo, start_index: int = 0, until: datetime = None) -> Iterator[EventSpec]:
+        """
+        Lazily yield the series' EventSpecs in tz, from start_index, stopping after until
+        (aware). Unbounded rules are only safe to expand with an until.
+        """
+        first_start = self.first_start
+        if first_start.tzinfo is not None:
+            first_start = first_start.astimezone(tz)
+        wall_times = rrulestr(self.rule, dtstart=first_start.replace(tzinfo=None))
+        for index, wall_time in enumerate(itertools.islice(wall_times, start_index, None), start_index):
+            event_date = localize(wall_time, tz)
+            if until is not None and event_date > until:
+                return
+            yield EventSpec(self.series_id, index, self.priority, self.event_name, event_date,
+                            event_date + self.duration if self.duration else None,
+                            self.max_capacity, self.description, self.cohosts)
+
+
+class SeriesScheduler:
+    def __init__(self,
+                 api: PartifulAPI,
+                 log_path: str = 'logs/event_series.jsonl',
+                 rate: float = 0.5,
+                 bucket: Any = None,
+                 horizon: timedelta = timedelta(days=365),
+                 skip_past: bool = True,
+                 clock=time.time,
+                 sleep=time.sleep,
+                 ):
+        """
+        :param log_path: append-only outcome log, replayed on the next run to resume
+        :param rate: create_event calls per second when no bucket is given
+        :param bucket: shared rate budget with acquire(), e.g. worker_fleet.FileTokenBucket
+        :param horizon: only occurrences starting within this long from now are created
+        :param skip_past: log occurrences that have already started as skipped instead of creating them
+        """
+        self.api = api
+        self.log_path = log_path
+        self.rate = rate
+        self.bucket = bucket
+        self.horizon = horizon
+        self.skip_past = skip_past
+        self.clock = clock
+        self.sleep = sleep
+        self._series: Dict[str, EventSeries] = {}
+        self._next_index: Dict[str, int] = {}
+        self._failed: List[Dict[str, Any]] = []
+        self._in_doubt: Dict[tuple, Dict[str, Any]] = {}  # (series, index) -> attempt with no outcome yet
+
+        directory = os.path.dirname(log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._replay()
+        self._log = open(log_path, 'a')
+
+    def _replay(self):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'rb+') as log_file:
+            content = log_file.read()
+            complete = content[:content.rfind(b'\n') + 1]
+            if len(complete) != len(content):
+                # drop a torn last write from a crash, so the next append starts on a fresh line
+                log_file.truncate(len(complete))
+        for line in complete.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self._apply(record)
+
+    def _apply(self, record: Dict[str, Any]):
+        series_id = record['series']
+        self._next_index[series_id] = max(self._next_index.get(series_id, 0), record['index'] + 1)
+        key = (series_id, record['index'])
+        if record['status'] == ATTEMPT:
+            self._in_doubt[key] = record
+            return
+        self._in_doubt.pop(key, None)
+        if record['status'] == FAILED:
+            self._failed.append(record)
+
+    def _append(self, record: Dict[str, Any]):
+        self._log.write(json.dumps(record, default=str) + '\n')
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._apply(record)
+
+    def add(self, series: EventSeries):
+        if series.series_id in self._series:
+            raise ValueError(f"Series '{series.series_id}' was already added")
+        self._series[series.series_id] = series
+
+    def next_index(self, series_id: str) -> int:
+        """Index of the series' first occurrence not yet handled."""
+        return self._next_index.get(series_id, 0)
+
+    def failed(self) -> List[Dict[str, Any]]:
+        """Logged failures, to check on Partiful and recreate by hand if the event is missing."""
+        return list(self._failed)
+
+    def in_doubt(self) -> List[Dict[str, Any]]:
+        """Attempts interrupted before their outcome was logged - the event may or may not exist."""
+        return list(self._in_doubt.values())
+
+    def _wait_for_slot(self, next_slot: float) -> float:
+        if self.bucket is not None:
+            self.bucket.acquire()
+            return next_slot
+        now = time.monotonic()
+        if next_slot > now:
+            self.sleep(next_slot - now)
+            now = next_slot
+        return now + 1.0 / self.rate
+
+    def run(self, stop_event: threading.Event = None, limit: int = None) -> Dict[str, int]:
+        """
+        Submit due occurrences of every series until all are handled, stop_event is set
+        or limit occurrences were handled. Returns counts of created/failed/skipped.
+        """
+        now = datetime.fromtimestamp(self.clock(), tz=timezone.utc)
+        until = now + self.horizon
+        heap, sequence = [], itertools.count()
+
+        def push(occurrences: Iterator[EventSpec]):
+            spec = next(occurrences, None)
+            if spec is not None:
+                heapq.heappush(heap, (spec.priority, spec.event_date.timestamp(), next(sequence), spec, occurrences))
+
+        for series in self._series.values():
+            push(series.occurrences(self.api.timezone, self.next_index(series.series_id), until))
+
+        summary = {CREATED: 0, FAILED: 0, SKIPPED: 0}
+        next_slot = time.monotonic()
+        while heap and not (stop_event is not None and stop_event.is_set()):
+            if limit is not None and sum(summary.values()) >= limit:
+                break
+            _, _, _, spec, occurrences = heapq.heappop(heap)
+            record = {'series': spec.series_id, 'index': spec.index, 'event_date': spec.event_date.isoformat()}
+            if self.skip_past and spec.event_date.timestamp() <= self.clock():
+                record['status'] = SKIPPED
+            else:
+                next_slot = self._wait_for_slot(next_slot)
+                self._append({**record, 'status': ATTEMPT})
+                try:
+                    record['url'] = self.api.create_event(spec.event_name, spec.event_date, spec.max_capacity,
+                                                          end_date=spec.end_date, description=spec.description,
+                                                          cohosts=spec.cohosts)
+                    record['status'] = CREATED
+                except Exception as e:
+                    record['status'] = FAILED
+                    record['error'] = f"{type(e).__name__}: {e}"
+                    logging.warning(f"Series {spec.series_id} occurrence {spec.index} failed: {record['error']}")
+            self._append(record)
+            summary[record['status']] += 1
+            push(occurrences)
+        logging.info(f"Series scheduler finished: {summary}")
+        return summary
+
+    def close(self):
+        self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
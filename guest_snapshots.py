@@ -0,0 +1,126 @@
+"""
+Delta exports of event guest lists.
+
+The last export of each event is kept on disk as a gzipped, guest-id-sorted TSV
+(guest_id, status, name). A new export is sorted once in memory and merge-joined
+against the stored snapshot as it streams off disk, yielding only guests that were
+added, removed or changed status. The new snapshot goes to a temp file and only
+replaces the old one once the delta has been fully consumed, so an interrupted
+import simply gets the same delta again next time.
+
+Usage:
+    store = SnapshotStore("logs/guest_snapshots")
+    for delta in export_guest_delta(api, "eventId123", store):
+        crm.upsert(delta)
+"""
+import gzip
+import os
+import re
+from collections import namedtuple
+from typing import Iterable, Iterator, List, Tuple
+
+from Partiful_Types import identified_guest_records
+from partiful_api import PartifulAPI
+
+ADDED, REMOVED, CHANGED = 'added', 'removed', 'status_changed'
+
+GuestDelta = namedtuple('GuestDelta', ['change', 'guest_id', 'name', 'old_status', 'new_status'])
+
+# (guest_id, status, name)
+_Row = Tuple[str, str, str]
+
+
+def _clean(value) -> str:
+    return re.sub(r'[\t\r\n]', ' ', value) if value else ''
+
+
+class SnapshotStore:
+    def __init__(self, directory: str = 'logs/guest_snapshots'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, event_id: str) -> str:
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_-]', '_', event_id) + '.tsv.gz')
+
+    def read(self, event_id: str) -> Iterator[_Row]:
+        """Stream the stored snapshot rows in guest_id order (nothing if there is none yet)."""
+        path = self.path(event_id)
+        if not os.path.exists(path):
+            return
+        with gzip.open(path, 'rt', encoding='utf-8') as snapshot:
+            for line in snapshot:
+                guest_id, status, name = line.rstrip('\n').split('\t')
+                yield guest_id, status, name
+
+    def delete(self, event_id: str):
+        """Forget an event's snapshot; its next export is a full list of additions."""
+        try:
+            os.remove(self.path(event_id))
+        except FileNotFoundError:
+            pass
+
+    def diff_and_replace(self, event_id: str, current: List[_Row]) -> Iterator[GuestDelta]:
+        """
+        Yield deltas between the stored snapshot and current (sorted by guest_id),
+        writing current as the new snapshot once the deltas are exhausted.
+        """
+        path = self.path(event_id)
+        tmp_path = path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as new_snapshot:
+            for row in current:
+                new_snapshot.write('\t'.join(row) + '\n')
+        committed = False
+        try:
+            yield from merge_diff(self.read(event_id), current)
+            os.replace(tmp_path, path)
+            committed = True
+        finally:
+            if not committed:
+                os.remove(tmp_path)
+
+
+def merge_diff(old: Iterable[_Row], new: Iterable[_Row]) -> Iterator[GuestDelta]:
+    """Merge-join two guest_id-sorted row streams into deltas."""
+    old_rows, new_rows = iter(old), iter(new)
+    old_row, new_row = next(old_rows, None), next(new_rows, None)
+    while old_row is not None or new_row is not None:
+        if new_row is None or (old_row is not None and old_row[0] < new_row[0]):
+            yield GuestDelta(REMOVED, old_row[0], old_row[2], old_row[1], None)
+            old_row = next(old_rows, None)
+        elif old_row is None or new_row[0] < old_row[0]:
+            yield GuestDelta(ADDED, new_row[0], new_row[2], None, new_row[1])
+            new_row = next(new_rows, None)
+        else:
+            if old_row[1] != new_row[1]:
+                yield GuestDelta(CHANGED, new_row[0], new_row[2], old_row[1], new_row[1])
+            old_row, new_row = next(old_rows, None), next(new_rows, None)
+
+
+def snapshot_rows(csv_text: str) -> List[_Row]:
+    """
+    Parse a guest export into snapshot rows sorted by guest_id (last row wins on
+    duplicate ids). Raises ValueError if the export has no guest ids, see
+    identified_guest_records.
+    """
+    rows = {}
+    for record in identified_guest_records(csv_text):
+        rows[_clean(record.guest_id)] = (_clean(record.status), _clean(record.name))
+    return [(guest_id, status, name) for guest_id, (status, name) in sorted(rows.items())]
+
+
+def export_guest_delta(api: PartifulAPI,
+                       event_id: str,
+                       store: SnapshotStore,
+                       statuses: List[str] = None,
+                       timeout: float = None,
+                       ) -> Iterator[GuestDelta]:
+    """
+    Export an event's guests and yield only what changed since the previous export.
+    The first export of an event yields every guest as added. Exports filtered by
+    statuses keep their own snapshot, so a filtered export never reads as removals.
+    """
+    csv_text = api.get_guests_csv(event_id, statuses=statuses, timeout=timeout)
+    current = snapshot_rows(csv_text)
+    del csv_text
+    snapshot_key = event_id if statuses is None else f"{event_id}__{'-'.join(sorted(statuses))}"
+    yield from store.diff_and_replace(snapshot_key, current)
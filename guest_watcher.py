@@ -0,0 +1,197 @@
+"""
+Watch guest lists of many events for RSVP status movement.
+
+Each event is polled on its own adaptive interval: it shrinks when the guest list
+changed or the event is about to start, and backs off while nothing happens.
+Unchanged exports are detected by hash and skipped without parsing; changed ones
+are diffed per guest and each change is passed to the registered callbacks.
+
+Usage:
+    watcher = GuestWatcher(api, callbacks=[print])
+    watcher.watch("eventId123", start_date=datetime(2025, 6, 1, 18, tzinfo=ZoneInfo("UTC")))
+    watcher.run(stop_event)
+"""
+import contextvars
+import hashlib
+import heapq
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from Partiful_Types import identified_guest_records
+from partiful_api import PartifulAPI
+
+GuestStatusChange = namedtuple('GuestStatusChange', ['event_id', 'guest_id', 'name', 'old_status', 'new_status'])
+
+
+class _WatchedEvent:
+    __slots__ = ('event_id', 'start_date', 'interval', 'next_poll', 'digest', 'statuses', 'names')
+
+    def __init__(self, event_id: str, start_date: Optional[datetime], interval: float, next_poll: float):
+        self.event_id = event_id
+        self.start_date = start_date
+        self.interval = interval
+        self.next_poll = next_poll
+        self.digest = None
+        self.statuses: Dict[str, str] = {}
+        self.names: Dict[str, str] = {}
+
+
+def diff_statuses(event_id: str,
+                  old: Dict[str, str],
+                  new: Dict[str, str],
+                  names: Dict[str, str] = None) -> List[GuestStatusChange]:
+    """Per-guest changes between two {guest_id: status} maps. Added/removed guests have a None status."""
+    names = names or {}
+    changes = []
+    for guest_id, status in new.items():
+        old_status = old.get(guest_id)
+        if old_status != status:
+            changes.append(GuestStatusChange(event_id, guest_id, names.get(guest_id), old_status, status))
+    for guest_id, old_status in old.items():
+        if guest_id not in new:
+            changes.append(GuestStatusChange(event_id, guest_id, names.get(guest_id), old_status, None))
+    return changes
+
+
+class GuestWatcher:
+    def __init__(self,
+                 api: PartifulAPI,
+                 callbacks: List[Callable[[GuestStatusChange], None]] = None,
+                 base_interval: float = 300,
+                 min_interval: float = 30,
+                 max_interval: float = 3600,
+                 backoff: float = 2.0,
+                 near_start_window: float = 24 * 3600,
+                 concurrency: int = 8,
+                 clock: Callable[[], float] = time.time,
+                 ):
+        """
+        :param base_interval: seconds between polls for a newly watched event
+        :param min_interval: fastest an event is ever polled
+        :param max_interval: slowest an idle event is polled
+        :param backoff: factor the interval grows by when idle and shrinks by on changes
+        :param near_start_window: seconds before start during which polling speeds up
+        :param concurrency: exports fetched in parallel per round
+        :param clock: time source in epoch seconds (overridable for tests)
+        """
+        self.api = api
+        self.callbacks = list(callbacks or [])
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.near_start_window = near_start_window
+        self.concurrency = concurrency
+        self.clock = clock
+        self._events: Dict[str, _WatchedEvent] = {}
+        self._schedule = []  # heap of (next_poll, event_id)
+        self._lock = threading.Lock()
+        self.stats = {'polls': 0, 'unchanged': 0, 'changes': 0, 'errors': 0}
+
+    def add_callback(self, callback: Callable[[GuestStatusChange], None]):
+        self.callbacks.append(callback)
+
+    def watch(self, event_id: str, start_date: datetime = None):
+        """Start watching an event; it is polled on the next round."""
+        with self._lock:
+            now = self.clock()
+            self._events[event_id] = _WatchedEvent(event_id, start_date, self.base_interval, now)
+            heapq.heappush(self._schedule, (now, event_id))
+
+    def unwatch(self, event_id: str):
+        with self._lock:
+            self._events.pop(event_id, None)  # its heap entry is dropped when popped
+
+    def _next_interval(self, watched: _WatchedEvent, changed: bool, now: float) -> float:
+        if changed:
+            interval = watched.interval / self.backoff
+        else:
+            interval = watched.interval * self.backoff
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        if watched.start_date is not None:
+            until_start = watched.start_date.timestamp() - now
+            if 0 <= until_start <= self.near_start_window:
+                # e.g. ~15 min a day out, down to min_interval in the last hour
+                interval = min(interval, max(self.min_interval, until_start / 100))
+        return interval
+
+    def _due(self, now: float) -> List[_WatchedEvent]:
+        due = []
+        with self._lock:
+            while self._schedule and self._schedule[0][0] <= now:
+                next_poll, event_id = heapq.heappop(self._schedule)
+                watched = self._events.get(event_id)
+                if watched is not None and watched.next_poll == next_poll:
+                    due.append(watched)
+        return due
+
+    def poll_due(self) -> int:
+        """Poll every event whose time has come. Returns how many were polled."""
+        due = self._due(self.clock())
+        if not due:
+            return 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            # copied per fetch so api.deadline() scopes around poll_due() reach the pool threads
+            futures = [pool.submit(contextvars.copy_context().run, self._fetch, watched) for watched in due]
+            exports = [future.result() for future in futures]
+        now = self.clock()
+        for watched, csv_text in zip(due, exports):
+            if csv_text is None:
+                self.stats['errors'] += 1
+            try:
+                changed = csv_text is not None and self._process(watched, csv_text)
+            except ValueError as e:  # an export we can't key by guest id
+                logging.warning(f"Guest export for event {watched.event_id} skipped: {e}")
+                self.stats['errors'] += 1
+                changed = False
+            watched.interval = self._next_interval(watched, changed, now)
+            watched.next_poll = now + watched.interval
+            with self._lock:
+                if watched.event_id in self._events:
+                    heapq.heappush(self._schedule, (watched.next_poll, watched.event_id))
+        return len(due)
+
+    def _fetch(self, watched: _WatchedEvent) -> Optional[str]:
+        try:
+            return self.api.get_guests_csv(watched.event_id)
+        except Exception as e:
+            logging.warning(f"Guest export failed for event {watched.event_id}: {e}")
+            return None
+
+    def _process(self, watched: _WatchedEvent, csv_text: str) -> bool:
+        """Diff a fresh export against the last one. Returns True if any guest changed."""
+        self.stats['polls'] += 1
+        digest = hashlib.blake2b(csv_text.encode(), digest_size=16).digest()
+        if digest == watched.digest:
+            self.stats['unchanged'] += 1
+            return False
+        statuses, names = {}, {}
+        for record in identified_guest_records(csv_text):
+            statuses[record.guest_id] = record.status
+            names[record.guest_id] = record.name
+        first_poll = watched.digest is None
+        watched.digest = digest
+        changes = [] if first_poll else diff_statuses(watched.event_id, watched.statuses, statuses,
+                                                      {**watched.names, **names})
+        watched.statuses, watched.names = statuses, names
+        self.stats['changes'] += len(changes)
+        for change in changes:
+            for callback in self.callbacks:
+                try:
+                    callback(change)
+                except Exception as e:
+                    logging.error(f"Guest watcher callback {callback} failed on {change}: {e}")
+        return bool(changes)
+
+    def run(self, stop_event: threading.Event):
+        """Poll until stop_event is set, sleeping until the next event is due."""
+        while not stop_event.is_set():
+            self.poll_due()
+            with self._lock:
+                next_poll = self._schedule[0][0] if self._schedule else self.clock() + self.min_interval
+            stop_event.wait(max(0.0, next_poll - self.clock()))
@@ -0,0 +1,196 @@
+"""
+Run PartifulAPI jobs from a JSONL file, writing results to a JSONL output as they
+complete and checkpointing successful line offsets so a crashed run can resume and
+failed jobs are retried by the next run.
+
+Each input line is a job:
+    {"id": "launch-party", "op": "create_event", "args": {"event_name": "Launch", "event_date": "2025-06-01T18:00:00-07:00", "max_capacity": 50}}
+    {"op": "get_guests_csv", "args": {"event_id": "abc123", "statuses": ["GOING"]}}
+
+Usage:
+    python job_runner.py jobs.jsonl results.jsonl --concurrency 8
+"""
+import argparse
+import contextvars
+import json
+import logging
+import os
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Set, Tuple
+
+import profiling
+from Partiful_Types import partiful_profile
+from partiful_api import PartifulAPI
+
+DATE_ARGS = ('event_date', 'end_date')
+
+
+def _create_event(api: PartifulAPI, args: Dict[str, Any]) -> str:
+    args = dict(args)
+    for key in DATE_ARGS:
+        if isinstance(args.get(key), str):
+            args[key] = datetime.fromisoformat(args[key])
+    return api.create_event(**args)
+
+
+JOB_OPS: Dict[str, Callable[[PartifulAPI, Dict[str, Any]], Any]] = {
+    'create_event': _create_event,
+    'get_mutuals': lambda api, args: api.get_mutuals(**args),
+    'get_rsvps': lambda api, args: api.get_rsvps(**args),
+    'get_guests_csv': lambda api, args: api.get_guests_csv(**args),
+}
+
+
+def run_job(api: PartifulAPI, job: Dict[str, Any]) -> Any:
+    """Execute one job dict ({"op": ..., "args": {...}}) against the api."""
+    op = job.get('op')
+    if op not in JOB_OPS:
+        raise ValueError(f"Unknown op '{op}' - supported ops: {sorted(JOB_OPS)}")
+    with profiling.section(f'job:{op}'):
+        return JOB_OPS[op](api, job.get('args') or {})
+
+
+def iter_jobs(jobs_path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (line offset, raw line) for every non-blank line, without loading the whole file."""
+    with open(jobs_path) as jobs_file:
+        for offset, line in enumerate(jobs_file):
+            if line.strip():
+                yield offset, line
+
+
+class Checkpoint:
+    """
+    Append-only file of finished input line offsets (succeeded, or failed in a way a
+    retry can't fix), written after the matching result line is flushed. A crash between the two writes replays that one job.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[int] = set()
+        if os.path.exists(path):
+            with open(path, 'r+') as checkpoint_file:
+                content = checkpoint_file.read()
+                complete = content[:content.rfind('\n') + 1]
+                if len(complete) != len(content):
+                    # drop a partial last line left by a crash mid-write
+                    checkpoint_file.truncate(len(complete))
+            self.done.update(int(line) for line in complete.split())
+        self._file = open(path, 'a')
+
+    def mark(self, offset: int):
+        self.done.add(offset)
+        self._file.write(f"{offset}\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class JobRunner:
+    def __init__(self,
+                 api: PartifulAPI,
+                 output_path: str,
+                 checkpoint_path: str = None,
+                 concurrency: int = 4,
+                 ):
+        """
+        :param output_path: JSONL file results are appended to, one line per job
+        :param checkpoint_path: where processed offsets are stored. Defaults to <output_path>.checkpoint
+        :param concurrency: number of jobs in flight at once
+        """
+        self.api = api
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+        self.concurrency = concurrency
+
+    def _execute(self, offset: int, line: str) -> Dict[str, Any]:
+        result = {'offset': offset, 'id': None, 'op': None, 'ok': False, 'result': None, 'error': None,
+                  'retryable': False}
+        start = time.perf_counter()
+        try:
+            job = json.loads(line)
+            result['id'], result['op'] = job.get('id'), job.get('op')
+            result['result'] = run_job(self.api, job)
+            result['ok'] = True
+        except json.JSONDecodeError as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+            # a malformed job line never parses; a malformed response body may not recur
+            result['retryable'] = result['op'] is not None
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+            # bad ops, arguments and models fail the same way every time; transport and API errors may not
+            result['retryable'] = not isinstance(e, (ValueError, TypeError))
+        result['elapsed_s'] = round(time.perf_counter() - start, 3)
+        return result
+
+    def run(self, jobs_path: str) -> Dict[str, int]:
+        """
+        Run every job that has not yet succeeded. Jobs that failed on a transport or API
+        error are written to the output but not checkpointed, so re-running retries them;
+        the output then holds one line per attempt. Jobs that can never succeed (malformed
+        line, unknown op, invalid arguments) are checkpointed with their failure. Returns
+        counts of ok/failed/skipped jobs.
+        """
+        checkpoint = Checkpoint(self.checkpoint_path)
+        summary = {'ok': 0, 'failed': 0, 'skipped': 0}
+        try:
+            with open(self.output_path, 'a') as output, ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                in_flight = set()
+
+                def drain(return_when):
+                    nonlocal in_flight
+                    finished, in_flight = wait(in_flight, return_when=return_when)
+                    for future in finished:
+                        result = future.result()
+                        output.write(json.dumps(result, default=str) + '\n')
+                        output.flush()
+                        summary['ok' if result['ok'] else 'failed'] += 1
+                        if not result['ok']:
+                            logging.warning(f"Job at line {result['offset']} failed "
+                                            f"({'will retry' if result['retryable'] else 'permanently'}): {result['error']}")
+                        if not result['retryable']:
+                            # a retryable failure isn't checkpointed, so the next run retries it (e.g. after an outage)
+                            checkpoint.mark(result['offset'])
+
+                for offset, line in iter_jobs(jobs_path):
+                    if offset in checkpoint.done:
+                        summary['skipped'] += 1
+                        continue
+                    # Bound in-flight work so huge job files are streamed, not queued in memory
+                    if len(in_flight) >= self.concurrency * 2:
+                        drain(FIRST_COMPLETED)
+                    # copied per job so api.deadline() scopes around run() reach the pool threads
+                    in_flight.add(pool.submit(contextvars.copy_context().run, self._execute, offset, line))
+                if in_flight:
+                    drain(ALL_COMPLETED)
+        finally:
+            checkpoint.close()
+        logging.info(f"Job run finished: {summary}")
+        return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('jobs', help="input JSONL of jobs")
+    parser.add_argument('output', help="output JSONL of results (appended to)")
+    parser.add_argument('--checkpoint', default=None, help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--auth-token', default=os.environ.get('PARTIFUL_AUTH_TOKEN'))
+    parser.add_argument('--user-id', default=os.environ.get('PARTIFUL_USER_ID'))
+    parser.add_argument('--timezone', default='America/Los_Angeles')
+    parser.add_argument('--http2', action='store_true', help="multiplex requests over one HTTP/2 connection")
+    args = parser.parse_args(argv)
+    if not args.auth_token or not args.user_id:
+        parser.error("--auth-token/--user-id (or PARTIFUL_AUTH_TOKEN/PARTIFUL_USER_ID) are required")
+
+    profile = partiful_profile(name='job_runner', user_id=args.user_id)
+    with PartifulAPI(profile, args.auth_token, local_timezone=args.timezone, http2=args.http2) as api, \
+            profiling.profile_run('job_runner'):  # only when PARTIFUL_PROFILE samples this run
+        summary = JobRunner(api, args.output, args.checkpoint, args.concurrency).run(args.jobs)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
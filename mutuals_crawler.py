@@ -0,0 +1,199 @@
+"""
+Breadth-first crawl of the mutuals graph via PartifulAPI.get_mutuals.
+
+User ids are interned to dense ints as they are discovered, so bookkeeping is a
+dict of id -> int plus flat arrays (expanded bitmap, edge endpoints) rather than
+per-node dicts and sets. Frontiers larger than spill_threshold are paged to disk.
+
+Usage:
+    crawler = MutualsCrawler(api, max_depth=2, max_nodes=50_000, concurrency=8)
+    crawler.crawl(api.user_id)
+    crawler.write_edge_list("mutuals_edges.tsv")
+"""
+import contextvars
+import logging
+import os
+import tempfile
+import threading
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List
+
+from Partiful_Types import mutual_records, next_cursor
+from partiful_api import PartifulAPI
+
+
+class _Frontier:
+    """Append-only array of interned node ints that pages itself to a temp file when large."""
+    def __init__(self, spill_threshold: int, spill_dir: str = None):
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self._buffer = array('I')
+        self._spill_file = None
+        self._spilled = 0
+
+    def append(self, node: int):
+        self._buffer.append(node)
+        if len(self._buffer) >= self.spill_threshold:
+            if self._spill_file is None:
+                self._spill_file = tempfile.TemporaryFile(dir=self.spill_dir)
+            self._buffer.tofile(self._spill_file)
+            self._spilled += len(self._buffer)
+            self._buffer = array('I')
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._buffer)
+
+    def __iter__(self) -> Iterator[int]:
+        if self._spill_file is not None:
+            self._spill_file.seek(0)
+            remaining = self._spilled
+            while remaining:
+                chunk = array('I')
+                chunk.fromfile(self._spill_file, min(remaining, self.spill_threshold))
+                remaining -= len(chunk)
+                yield from chunk
+        yield from self._buffer
+
+    def close(self):
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+
+class MutualsCrawler:
+    def __init__(self,
+                 api: PartifulAPI,
+                 max_depth: int = 2,
+                 max_nodes: int = 10_000,
+                 concurrency: int = 8,
+                 page_size: int = 100,
+                 max_pages: int = 50,
+                 spill_threshold: int = 100_000,
+                 spill_dir: str = None,
+                 fetch_mutuals: Callable[[str], List[str]] = None,
+                 ):
+        """
+        :param max_depth: how many hops from the root to expand
+        :param max_nodes: stop discovering new users once this many are known
+        :param concurrency: get_mutuals calls in flight at once
+        :param page_size: maxResults requested per get_mutuals call
+        :param max_pages: get_mutuals pages followed per user; users with more mutuals are
+            counted in self.truncated
+        :param spill_threshold: frontier size (in users) past which it is paged to spill_dir
+        :param fetch_mutuals: override how neighbours of a user id are fetched
+        """
+        self.api = api
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.concurrency = concurrency
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.fetch_mutuals = fetch_mutuals or self._fetch_all_pages
+
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._expanded = bytearray()
+        self.edge_src = array('I')
+        self.edge_dst = array('I')
+        self.failures = 0
+        self.truncated = 0  # users whose mutuals had more than max_pages pages
+        self._truncated_lock = threading.Lock()
+
+    def _fetch_all_pages(self, user_id: str) -> List[str]:
+        """Follow get_mutuals' paging cursor until the last page (or max_pages)."""
+        neighbours, cursor, seen_cursors = [], None, set()
+        for _ in range(self.max_pages):
+            response = self.api.get_mutuals(user_id=user_id, max_results=self.page_size, cursor=cursor)
+            neighbours.extend(record.user_id for record in mutual_records(response))
+            cursor = next_cursor(response)
+            if cursor is None or cursor in seen_cursors:
+                return neighbours
+            seen_cursors.add(cursor)
+        with self._truncated_lock:
+            self.truncated += 1
+        logging.warning(f"Mutuals of {user_id} truncated after {self.max_pages} pages")
+        return neighbours
+
+    def _intern(self, user_id: str) -> int:
+        node = self._ids.get(user_id)
+        if node is None:
+            node = len(self._names)
+            self._ids[user_id] = node
+            self._names.append(user_id)
+            self._expanded.append(0)
+        return node
+
+    @property
+    def node_count(self) -> int:
+        return len(self._names)
+
+    def crawl(self, root_user_id: str) -> int:
+        """Expand the graph from root_user_id. Returns the number of users discovered."""
+        frontier = _Frontier(self.spill_threshold, self.spill_dir)
+        frontier.append(self._intern(root_user_id))
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for depth in range(self.max_depth):
+                next_frontier = _Frontier(self.spill_threshold, self.spill_dir)
+                self._expand_level(pool, frontier, next_frontier)
+                frontier.close()
+                frontier = next_frontier
+                logging.info(f"Mutuals crawl depth {depth + 1}: {self.node_count} users, {len(self.edge_src)} edges, "
+                             f"{self.truncated} truncated")
+                if not len(frontier):
+                    break
+        frontier.close()
+        return self.node_count
+
+    def _expand_level(self, pool: ThreadPoolExecutor, frontier: _Frontier, next_frontier: _Frontier):
+        # Results are handled on this thread only, so interning needs no locking
+        in_flight = {}
+
+        def handle(done):
+            for future in done:
+                node = in_flight.pop(future)
+                try:
+                    neighbours = future.result()
+                except Exception as e:
+                    self.failures += 1
+                    logging.warning(f"get_mutuals failed for {self._names[node]}: {e}")
+                    continue
+                self._expanded[node] = 1
+                for user_id in neighbours:
+                    neighbour = self._ids.get(user_id)
+                    if neighbour is None:
+                        if self.node_count >= self.max_nodes:
+                            continue
+                        neighbour = self._intern(user_id)
+                        next_frontier.append(neighbour)
+                    # Mutuals are symmetric: keep the edge once, from whichever side expands first
+                    if neighbour != node and not self._expanded[neighbour]:
+                        self.edge_src.append(node)
+                        self.edge_dst.append(neighbour)
+
+        for node in frontier:
+            if len(in_flight) >= self.concurrency * 2:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                handle(done)
+            # copied per call so api.deadline() scopes around crawl() reach the pool threads
+            in_flight[pool.submit(contextvars.copy_context().run, self.fetch_mutuals, self._names[node])] = node
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            handle(done)
+
+    def edges(self) -> Iterator[tuple]:
+        """Yield (user_id, user_id) pairs."""
+        names = self._names
+        for src, dst in zip(self.edge_src, self.edge_dst):
+            yield names[src], names[dst]
+
+    def write_edge_list(self, path: str, sep: str = '\t') -> int:
+        """Write one 'source<sep>target' line per edge (loads directly into networkx/pandas). Returns edge count."""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as edge_file:
+            for src, dst in self.edges():
+                edge_file.write(f"{src}{sep}{dst}\n")
+        os.replace(tmp_path, path)
+        return len(self.edge_src)
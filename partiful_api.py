@@ -1,20 +1,50 @@
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
+import contextvars
+import http.cookiejar
 import logging
-from typing import List, Dict, Any
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
 import Partiful_Types 
+import compression
+import profiling
 from Partiful_Types import Event, RequestBody, Data, partiful_profile
 from zoneinfo import ZoneInfo
-from requests.exceptions import JSONDecodeError
 import json
 from pydantic import BaseModel
 from logging_config import setup_logging
 
+try:
+    import httpx # optional, only needed for the HTTP/2 transport
+except ImportError:
+    httpx = None
+
 setup_logging()
 
 EVENT_PREFIX_URL = "https://partiful.com/e/"
 PARTIFUL_API_URL = "https://api.partiful.com/"
 
+# Open api.deadline() scopes as ((api, expires_at), ...). A context variable rather than a
+# thread-local so pool work submitted with contextvars.copy_context().run inherits them.
+_deadline_scopes = contextvars.ContextVar('partiful_deadline_scopes', default=())
+
+class DeadlineExceeded(TimeoutError):
+    """The call's time budget (timeout, default_timeout or api.deadline scope) ran out."""
+    request_sent = True  # False when the budget ran out before the request went out
+
+
+class APIError(Exception):
+    """Partiful answered the request with a non-200 status or an error payload."""
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
 # create_event_inputs = {'event_name': str, 'event_date': datetime, 'max_capacity': int, 'end_date': datetime, 'description': str, 'cohosts': List[str]}
 
 class PartifulAPI:
@@ -22,7 +52,18 @@ class PartifulAPI:
                  default_profile: partiful_profile,
                  auth_token: str,
                  local_timezone: str = 'America/Los_Angeles',
+                 http2: bool = False,
+                 compress_requests_over: int = None,
+                 default_timeout: float = None,
                  ):
+        """
+        :param http2: send requests over a single multiplexed HTTP/2 connection (httpx + h2)
+            instead of one HTTP/1.1 connection per request (requests). Set False to fall back.
+        :param compress_requests_over: gzip request bodies of at least this many bytes
+            (e.g. bulk payloads). None sends every body uncompressed.
+        :param default_timeout: seconds each call may take end to end (connect, read, body)
+            when no per-call timeout is given. None means no limit.
+        """
         self.default_profile = default_profile
         self.auth_token = auth_token
         self.user_id = default_profile.user_id
@@ -33,17 +74,27 @@ class PartifulAPI:
                 'Referer': 'https://partiful.com/',
                 'Origin': 'https://partiful.com',
                 'Accept': '*/*',
-                'Accept-Encoding': 'gzip, deflate, br, zstd',
+                'Accept-Encoding': compression.accept_encoding(),
                 'Accept-Language': 'en-US,en;q=0.5',
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:138.0) Gecko/20100101 Firefox/138.0'
             }
-        
+        self.http2 = http2
+        self._http2_client = None
+        self._http2_lock = threading.Lock()
+        self.compress_requests_over = compress_requests_over
+        self.compression_stats = compression.CompressionStats()
+        self.default_timeout = default_timeout
+        self.cassette = None  # set by cassette.Cassette.record()/replay()
+        self._session = None  # pooled HTTP/1.1 session, opened by warmup()
+        self.warmup_metrics = None
+
     def create_event(self, event_name: str, 
                      event_date: datetime,
                      max_capacity: int,
                      end_date: datetime = None,
                      description: str = "",
-                     cohosts: List[str] = []
+                     cohosts: List[str] = [],
+                     timeout: float = None,
                      ) -> str:
         def check_tz(dt: datetime) -> datetime:
             """Convert datetime to UTC string."""
@@ -57,52 +108,53 @@ class PartifulAPI:
         
         url = PARTIFUL_API_URL+ 'createEvent'
 
-        event = Event(
-                        title=event_name,
-                        start_date_utc=start_utc_str,
-                        endDate=end_utc_str,
-                        timezone=self.timezone,
-                        guestStatusCounts={
-                            'READY_TO_SEND': 0,
-                            'SENDING': 0,
-                            'SENT': 0,
-                            'SEND_ERROR': 0,
-                            'DELIVERY_ERROR': 0,
-                            'MAYBE': 0,
-                            'GOING': 0,
-                            'DECLINED': 0,
-                            'WAITLIST': 0,
-                            'PENDING_APPROVAL': 0,
-                            'APPROVED': 0,
-                            'WITHDRAWN': 0,
-                            'RESPONDED_TO_FIND_A_TIME': 0
-                        },
-                        showHostList=True,
-                        showGuestCount=True,
-                        showGuestList=True,
-                        showActivityTimestamps=True,
-                        displayInviteButton=True,
-                        visibility='public',
-                        allowGuestPhotoUpload=True,
-                        enableGuestReminders=True,
-                        rsvpsEnabled=True,
-                        allowGuestsToInviteMutuals=True,
-                        status='PUBLISHED', #SAVED
-                        maxCapacity=max_capacity,
-                        enableWaitlist=True,
-                        description=description
-                    )
+        with profiling.section('pydantic.build:createEvent'):
+            event = Event(
+                            title=event_name,
+                            start_date_utc=start_utc_str,
+                            endDate=end_utc_str,
+                            timezone=self.timezone,
+                            guestStatusCounts={
+                                'READY_TO_SEND': 0,
+                                'SENDING': 0,
+                                'SENT': 0,
+                                'SEND_ERROR': 0,
+                                'DELIVERY_ERROR': 0,
+                                'MAYBE': 0,
+                                'GOING': 0,
+                                'DECLINED': 0,
+                                'WAITLIST': 0,
+                                'PENDING_APPROVAL': 0,
+                                'APPROVED': 0,
+                                'WITHDRAWN': 0,
+                                'RESPONDED_TO_FIND_A_TIME': 0
+                            },
+                            showHostList=True,
+                            showGuestCount=True,
+                            showGuestList=True,
+                            showActivityTimestamps=True,
+                            displayInviteButton=True,
+                            visibility='public',
+                            allowGuestPhotoUpload=True,
+                            enableGuestReminders=True,
+                            rsvpsEnabled=True,
+                            allowGuestsToInviteMutuals=True,
+                            status='PUBLISHED', #SAVED
+                            maxCapacity=max_capacity,
+                            enableWaitlist=True,
+                            description=description
+                        )
         
-        request_model = RequestBody(
-                        data=Data(
-                                params=Partiful_Types.CreateEventParams(event=event,
-                                    saveAsDraft=False,
-                                    cohostIds=cohosts
-                                    ),
-                                userId=self.user_id
+            request_model = RequestBody(
+                            data=Data(
+                                    params=Partiful_Types.CreateEventParams(event=event,
+                                        saveAsDraft=False,
+                                        cohostIds=cohosts
+                                        ),
+                                    userId=self.user_id
+                                )
                             )
-                        )
-        response_json = self.call_api(url, method='POST', model=request_model)
+        response_json = self.call_api(url, method='POST', model=request_model, timeout=timeout)
 
 
         try:
@@ -115,25 +167,29 @@ class PartifulAPI:
 
         return output_url
 
-    def get_mutuals(self) -> Dict[str, Any]:
-        """Get mutual connections."""
+    def get_mutuals(self, user_id: str = None, max_results: int = 8, cursor: str = None,
+                    timeout: float = None) -> Dict[str, Any]:
+        """
+        Get mutual connections.
+
+        :param user_id: whose mutuals to fetch, defaults to the client's user
+        :param max_results: page size requested from the API
+        :param cursor: page to fetch, from Partiful_Types.next_cursor of the previous page
+        :param timeout: seconds this call may take, see call_api
+        """
         url = PARTIFUL_API_URL+'getMutuals'
-        
-        request_body = json.dumps({
-            'data': {
-                'params': {'shouldRemoveEventData': True},
-                'paging': {'cursor': None, 'maxResults': 8},
-                "userId": self.user_id
-            }
-            })
-        
-        request_model = RequestBody(data=Data(params=Partiful_Types.GetMutualsParams(), paging=Partiful_Types.Paging(), userId=self.user_id))
 
-        response_json = self.call_api(url, method='POST', model=request_model)
+        with profiling.section('pydantic.build:getMutuals'):
+            request_model = RequestBody(data=Partiful_Types.GetMutualsData(
+                                            params=Partiful_Types.GetMutualsParams(shouldRemoveEventData=True),
+                                            paging=Partiful_Types.Paging(maxResults=max_results, cursor=cursor),
+                                            userId=user_id or self.user_id))
+
+        response_json = self.call_api(url, method='POST', model=request_model, timeout=timeout)
 
         return response_json
 
-    def get_rsvps(self) -> Any:
+    def get_rsvps(self, timeout: float = None) -> Any:
         """
         Get events you have RSVP-ed to 
         """
@@ -141,39 +197,287 @@ class PartifulAPI:
 
         request_model = RequestBody(data=Data(params={}, userId=self.user_id))
 
-        response = self.call_api(url, method='POST', model=request_model)
+        response = self.call_api(url, method='POST', model=request_model, timeout=timeout)
 
         return response
 
-    def call_api(self, url: str, method: str = 'GET', model: BaseModel = None) -> Any:
-        """Generic API call."""
-        model_dump = model.model_dump_json() if model else None
-        if method == 'GET':
-            response = requests.get(url, headers=self.headers)
-        elif method == 'POST':
-            response = requests.post(url, headers=self.headers, data=model_dump)
-        else:
+    def call_api(self, url: str, method: str = 'GET', model: BaseModel = None, expect_json: bool = True,
+                 timeout: float = None) -> Any:
+        """
+        Generic API call.
+
+        :param expect_json: parse and return the JSON body. If False, return the body as text
+            (e.g. CSV exports).
+        :param timeout: seconds the whole call may take, overriding default_timeout. Always
+            capped by an enclosing api.deadline() scope. Raises DeadlineExceeded when exhausted.
+        """
+        expires_at = self._expires_at(timeout)
+        endpoint = compression.endpoint_name(url)
+        with profiling.section(f'pydantic.dump:{endpoint}'):
+            model_dump = model.model_dump_json() if model else None
+        if method not in ('GET', 'POST'):
             raise ValueError("Unsupported HTTP method - only GET and POST are supported.")
+        with profiling.section(f'http:{endpoint}'):
+            response = self._send(method, url, model_dump, expires_at)
 
         if response.status_code != 200:
             try:
                 resp_json = response.json()
-            except JSONDecodeError:
+            except json.JSONDecodeError:
                 resp_json = None
-            raise Exception(f"Error calling API: {response.status_code} {response}, - {response.text} =  {resp_json}")
+            raise APIError(f"Error calling API: {response.status_code} {response}, - {response.text} =  {resp_json}",
+                           response.status_code)
+        if not expect_json:
+            return response.text
         if response.headers.get("Content-Type", "").startswith("application/json"):
-            resp_json = response.json()
+            with profiling.section(f'json:{endpoint}'):
+                resp_json = response.json()
             if "error" in resp_json:
-                raise Exception(f"API Error: {resp_json['error'].get('message', 'Unknown error')}")
+                raise APIError(f"API Error: {resp_json['error'].get('message', 'Unknown error')}", response.status_code)
         else:
             raise Exception(f"Expected JSON response but got: {response.text}")
-        return response.json()
+        return resp_json
+
+    @contextmanager
+    def deadline(self, seconds: float):
+        """
+        Give every call made through this api inside the block a shared time budget:
+
+            with api.deadline(5.0):
+                api.get_mutuals()
+                api.get_rsvps()  # raises DeadlineExceeded if the 5s are already spent
+
+        Nested scopes can only tighten the budget. The scope follows the current context,
+        so it also covers work handed to a thread pool with contextvars.copy_context().run
+        (as JobRunner, MutualsCrawler and GuestWatcher do), but not worker processes.
+        """
+        stack = self._deadline_stack()
+        expires_at = time.monotonic() + seconds
+        if stack:
+            expires_at = min(expires_at, stack[-1])
+        token = _deadline_scopes.set(_deadline_scopes.get() + ((self, expires_at),))
+        try:
+            yield
+        finally:
+            _deadline_scopes.reset(token)
+
+    def _deadline_stack(self) -> List[float]:
+        """Expiry times of this api's open deadline scopes, outermost first."""
+        return [expires_at for api, expires_at in _deadline_scopes.get() if api is self]
+
+    def _expires_at(self, timeout: float = None) -> Optional[float]:
+        """Monotonic time a call starting now must finish by, or None for no limit."""
+        timeout = timeout if timeout is not None else self.default_timeout
+        candidates = [time.monotonic() + timeout] if timeout is not None else []
+        stack = self._deadline_stack()
+        if stack:
+            candidates.append(stack[-1])
+        return min(candidates) if candidates else None
+
+    @staticmethod
+    def _remaining(expires_at: Optional[float]) -> Optional[float]:
+        if expires_at is None:
+            return None
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            error = DeadlineExceeded("Time budget exhausted before the request could be sent")
+            error.request_sent = False
+            raise error
+        return remaining
+
+    def _send(self, method: str, url: str, body: str = None, expires_at: float = None) -> Any:
+        """Send within the remaining time budget, surfacing any transport timeout as DeadlineExceeded."""
+        try:
+            if self.cassette is not None:
+                return self.cassette.send(self._send_within, method, url, body, expires_at)
+            return self._send_within(method, url, body, expires_at)
+        except DeadlineExceeded:
+            raise
+        except (TimeoutError, requests.exceptions.Timeout) as e:
+            raise DeadlineExceeded(f"Request to {url} ran out of time: {e}") from e
+        except Exception as e:
+            if httpx is not None and isinstance(e, httpx.TimeoutException):
+                raise DeadlineExceeded(f"Request to {url} ran out of time: {e}") from e
+            raise
+
+    def _send_within(self, method: str, url: str, body: str = None, expires_at: float = None) -> Any:
+        """
+        Send a request over HTTP/2 (httpx) or HTTP/1.1 (requests), returning the raw response.
+        Compresses large bodies and records compressed vs uncompressed bytes per endpoint.
+        """
+        endpoint = compression.endpoint_name(url)
+        headers = self.headers
+        if body is not None:
+            body = body.encode() if isinstance(body, str) else body
+            uncompressed_size = len(body)
+            if self.compress_requests_over is not None and uncompressed_size >= self.compress_requests_over:
+                body = compression.gzip_body(body)
+                headers = {**self.headers, 'Content-Encoding': 'gzip'}
+            self.compression_stats.record_request(endpoint, uncompressed_size, len(body))
+
+        timeout = self._remaining(expires_at)
+        if self.http2:
+            # httpx decodes br/zstd itself with the same decoders compression checks for. Its
+            # timeout is per operation, so the deadline bounds the whole body here too.
+            with self._get_http2_client().stream(method, url, headers=headers, content=body,
+                                                 timeout=timeout) as response:
+                parts = []
+                for chunk in response.iter_bytes():
+                    parts.append(chunk)
+                    if expires_at is not None and time.monotonic() > expires_at:
+                        raise TimeoutError("Response body still streaming when the deadline passed")
+                response._content = b''.join(parts)
+            self.compression_stats.record_response(endpoint, response.num_bytes_downloaded, len(response.content))
+            return response
+
+        transport = self._session if self._session is not None else requests
+        if method == 'GET':
+            response = transport.get(url, headers=headers, stream=True, timeout=timeout)
+        else:
+            response = transport.post(url, headers=headers, data=body, stream=True, timeout=timeout)
+        if isinstance(response, requests.Response):
+            # requests' read timeout is per socket read; the deadline also bounds the whole body
+            wire_bytes = compression.read_body(response, deadline=expires_at)
+            self.compression_stats.record_response(endpoint, wire_bytes, len(response.content))
+        return response
+
+    def _get_http2_client(self) -> "httpx.Client":
+        """
+        Lazily create the shared HTTP/2 client. httpx.Client is thread safe, so concurrent
+        calls from a thread pool are multiplexed as streams over one connection.
+        """
+        client = self._http2_client
+        if client is None:
+            with self._http2_lock:
+                if self._http2_client is None:
+                    if httpx is None:
+                        raise ImportError("http2=True requires httpx and h2: pip install 'httpx[http2]'")
+                    self._http2_client = httpx.Client(http2=True)
+                client = self._http2_client
+        return client
+
+    def warmup(self, connect: bool = True, pool_size: int = 10, base_url: str = PARTIFUL_API_URL,
+               timeout: float = 5.0, connections: int = 1) -> Dict[str, Any]:
+        """
+        Pay the first request's one-off costs up front: resolve the API host, build and
+        exercise the Partiful_Types request models, and open pooled connections (TLS
+        included) that later calls reuse. Over HTTP/1.1 this switches the client from
+        one connection per request to a keep-alive session holding up to pool_size
+        connections; the session keeps no cookies, so calls stay independent as before.
+        Over HTTP/2 a single multiplexed connection is opened whatever connections is.
+        Failures are logged and reported, never raised, so a worker can always start.
+
+        :param connect: also open the connection, not just resolve the host
+        :param pool_size: most idle HTTP/1.1 connections the session keeps
+        :param connections: HTTP/1.1 connections to open now (at most pool_size), e.g. the
+            number of threads that will call concurrently
+        :return: seconds spent per step, also kept in self.warmup_metrics
+        """
+        metrics = {'errors': []}
+        start = time.perf_counter()
+        parsed = urlparse(base_url)
+        try:
+            socket.getaddrinfo(parsed.hostname, parsed.port or 443, type=socket.SOCK_STREAM)
+        except OSError as e:
+            metrics['errors'].append(f"dns: {e}")
+        metrics['dns_s'] = round(time.perf_counter() - start, 4)
+
+        step = time.perf_counter()
+        ZoneInfo('UTC')  # create_event converts every date to UTC
+        metrics['models'] = Partiful_Types.warm_models()
+        metrics['models_s'] = round(time.perf_counter() - step, 4)
+
+        if connect:
+            step = time.perf_counter()
+            # no Authorization header: this request only opens the connection
+            headers = {'User-Agent': self.headers['User-Agent'], 'Accept': '*/*'}
+            def open_connection(_=None):
+                try:
+                    if self.http2:
+                        self._get_http2_client().head(base_url, headers=headers, timeout=timeout)
+                    else:
+                        self._session.head(base_url, headers=headers, timeout=timeout)
+                except Exception as e:  # requests/httpx/ssl errors alike; the first real call will retry
+                    metrics['errors'].append(f"connect: {e}")
+
+            if self.http2:
+                open_connection()
+                metrics['connections'] = 1
+            else:
+                if self._session is None:
+                    session = requests.Session()
+                    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+                    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                    self._session = session
+                # concurrent requests, so each one has to open its own connection
+                metrics['connections'] = max(1, min(connections, pool_size))
+                with ThreadPoolExecutor(max_workers=metrics['connections']) as pool:
+                    list(pool.map(open_connection, range(metrics['connections'])))
+            metrics['connect_s'] = round(time.perf_counter() - step, 4)
+
+        metrics['total_s'] = round(time.perf_counter() - start, 4)
+        for error in metrics['errors']:
+            logging.warning(f"Warmup step failed: {error}")
+        logging.info(f"Warmup finished: {metrics}")
+        self.warmup_metrics = metrics
+        return metrics
+
+    def client_state(self) -> Dict[str, Any]:
+        """
+        JSON-serialisable snapshot of this client's configuration, for handing to a new
+        worker (see from_state). Contains the auth token - store it like a secret.
+        """
+        return {
+            'version': 1,
+            'profile': {'name': getattr(self.default_profile, 'name', None), 'user_id': self.user_id},
+            'auth_token': self.auth_token,
+            'local_timezone': self.timezone.key,
+            'http2': self.http2,
+            'compress_requests_over': self.compress_requests_over,
+            'default_timeout': self.default_timeout,
+            'warm': self.warmup_metrics is not None,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], warmup: bool = None, **warmup_kwargs) -> "PartifulAPI":
+        """
+        Build a client from client_state(). It is warmed up straight away when the
+        snapshot's client was (or when warmup=True), so the worker's first call starts hot.
+        """
+        if state.get('version') != 1:
+            raise ValueError(f"Unsupported client state version: {state.get('version')}")
+        api = cls(partiful_profile(**state['profile']), state['auth_token'],
+                  local_timezone=state['local_timezone'], http2=state['http2'],
+                  compress_requests_over=state['compress_requests_over'],
+                  default_timeout=state['default_timeout'])
+        if warmup is None:
+            warmup = state.get('warm', False)
+        if warmup:
+            api.warmup(**warmup_kwargs)
+        return api
+
+    def close(self):
+        """Close the pooled HTTP/2 connection and HTTP/1.1 session, if opened."""
+        with self._http2_lock:
+            if self._http2_client is not None:
+                self._http2_client.close()
+                self._http2_client = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def get_guests_csv(
         self,
         event_id: str,
         statuses: List[str] = None,
-        questionnaire: bool = True
+        questionnaire: bool = True,
+        timeout: float = None,
     ) -> str:
         """Get guest information in CSV format."""
         if statuses is None:
@@ -189,6 +493,4 @@ class PartifulAPI:
             if status in allowed_statuses:
                 url += f'&statuses={status}'
         
-        response = self.call_api( url, method='GET')
-        
-        return response.text
+        return self.call_api(url, method='GET', expect_json=False, timeout=timeout)
@@ -1,8 +1,11 @@
 from collections import namedtuple
-from datetime import datetime
 import json
+import os
+import threading
 from os import environ
 from Partiful_Types import partiful_profile
+from debug_artifacts import ArtifactWriter
+import profiling
 from selenium.common.exceptions import ElementClickInterceptedException, TimeoutException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver import Chrome, ChromeOptions
@@ -22,8 +25,114 @@ import random
 TWILIO_ACCOUNT_SID = environ['TWILIO_ACCOUNT_SID']
 TWILIO_AUTH_TOKEN = environ['TWILIO_AUTH_TOKEN']
 
+# Lean browser mode: resources the login flow doesn't need, blocked via CDP.
+# Only analytics/ads hosts are blocked - auth (firebase/googleapis) and recaptcha must load.
+LEAN_BLOCKED_URLS = [
+    # images, fonts, media
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.mp4', '*.webm', '*.mp3',
+    # third-party analytics/ads
+    '*googletagmanager.com*', '*google-analytics.com*', '*doubleclick.net*', '*facebook.net*',
+    '*segment.com*', '*segment.io*', '*sentry.io*', '*hotjar.com*', '*intercom.io*',
+    '*amplitude.com*', '*mixpanel.com*', '*tiktok.com*', '*clarity.ms*',
+]
+LEAN_CHROME_ARGS = [
+    "--window-size=1024,768",
+    "--blink-settings=imagesEnabled=false",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication",
+    "--mute-audio",
+    "--no-first-run",
+]
+
+
+def _process_tree_pids(root_pid: int) -> list:
+    """A process and all its descendants, found by walking /proc (Linux)."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as stat_file:
+                    ppid = int(stat_file.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def _rss(pids: list) -> int:
+    """Summed resident memory in bytes of pids; ones that have exited count as 0."""
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/statm') as statm_file:
+                total += int(statm_file.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            pass
+    return total
+
+
+def _process_tree_rss(root_pid: int) -> int:
+    """Resident memory in bytes of a process and all its descendants (Linux /proc), or None."""
+    if root_pid is None or not os.path.isdir('/proc'):
+        return None
+    return _rss(_process_tree_pids(root_pid))
+
+
+class _RssSampler:
+    """
+    Tracks the peak resident memory of a process tree on a background thread. Each tick
+    only reads the known processes' statm; the tree is re-walked from /proc every
+    rescan_every ticks to pick up new Chrome renderers.
+    """
+    def __init__(self, root_pid: int, interval: float = 0.25, rescan_every: int = 8):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.rescan_every = rescan_every
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.root_pid is None or not os.path.isdir('/proc'):
+            return self  # peak stays None off Linux or without a driver process
+        self._thread = threading.Thread(target=self._run, name='login-rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        tick = 0
+        while True:
+            if tick % self.rescan_every == 0:
+                pids = _process_tree_pids(self.root_pid)
+            rss = _rss(pids)
+            if self.peak is None or rss > self.peak:
+                self.peak = rss
+            tick += 1
+            if self._stop.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
 class PartifulBot:
-    def __init__(self, phone_number: str, default_profile: partiful_profile):
+    def __init__(self, phone_number: str, default_profile: partiful_profile, artifacts: ArtifactWriter = None,
+                 lean_browser: bool = False):
         """
         Initialize the PartifulBot with a phone number and optional profiles.
 
@@ -34,15 +143,24 @@ class PartifulBot:
         :param default_profile: User profile you want to use for API calls. 
             # TODO: make this optional and default
             # TODO: consider making userId used for API calls not tied to class instantiation
+        :param artifacts: where debug screenshots/driver logs go. By default they are only kept
+            when login fails, unless PARTIFUL_DEBUG_ARTIFACTS=1 is set.
+        :param lean_browser: block images, fonts, media and analytics hosts, use a smaller viewport
+            and disable unneeded Chrome features, for faster and lighter logins.
         """
         self.phone_number = phone_number # must be a twilio number to access verification code
         self._bearer_token = None
         self.default_profile = default_profile if default_profile else None
+        self._artifacts = artifacts if artifacts else ArtifactWriter()
+        self.lean_browser = lean_browser
+        self.login_metrics = {}
+        self._rss_sampler = None
 
         self._service = Service(ChromeDriverManager().install())
         self._selenium_driver = self._setup_driver()
         logging.info("Selenium driver initialized.")
         self._driver_logs = []
+        self._driver_logs_saved = False
         
         
     def _setup_driver(self) -> Chrome:
@@ -50,14 +168,22 @@ class PartifulBot:
         chrome_options = ChromeOptions()
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
         chrome_options.add_argument('--enable-logging')
-        chrome_options.add_argument("--window-size=1920,1080")
+        if self.lean_browser:
+            for argument in LEAN_CHROME_ARGS:
+                chrome_options.add_argument(argument)
+        else:
+            chrome_options.add_argument("--window-size=1920,1080")
         chrome_options.add_argument('--log-level=0')
         chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
         chrome_options.add_argument("--headless=new")
         #chrome_options.add_argument("--no-sandbox")
         #chrome_options.add_argument("--disable-dev-shm-usage")
         #chrome_options.add_argument("--disable-gpu")
-        return Chrome(service=self._service, options=chrome_options)
+        driver = Chrome(service=self._service, options=chrome_options)
+        if self.lean_browser:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+        return driver
 
     def _is_driver_alive(self) -> bool:
         """
@@ -78,9 +204,26 @@ class PartifulBot:
         """
         Navigate to website and submit phone number + verification code.
         Get bearer token from network logs.
+        Each step is a profiling section (login:<step>) for profiled runs.
         """
-        self._selenium_driver.get('https://partiful.com/login') # 
+        phases = profiling.Phases('login')
+        # peak memory of chromedriver + its Chrome processes over the whole login
+        process = getattr(self._service, 'process', None)
+        self._rss_sampler = _RssSampler(getattr(process, 'pid', None)).start()
+        with profiling.profile_run('login'):
+            try:
+                self._login(phases)
+            finally:
+                phases.end()
+                self._rss_sampler.stop()
+
+    def _login(self, phases: profiling.Phases):
+        login_start = time.perf_counter()
+        phases.next('page_load')
+        self._selenium_driver.get('https://partiful.com/login') # blocks until the page's load event
+        page_load_s = time.perf_counter() - login_start
         
+        phases.next('phone_number')
         # Wait for phone input field, enter phone num,  and submit
         logging.info("Inputting phone number...")
         time.sleep(5) # wait for page to load
@@ -96,10 +239,12 @@ class PartifulBot:
         submit_button = self._selenium_driver.find_element(By.XPATH, "//button[@type='submit']")
         submit_button.click()
 
+        phases.next('verification_code')
         # Get verification code, and submit it
         logging.info("Waiting for verification code...")
         time.sleep(5)
         verification_code = self.get_verification_code()
+        phases.next('submit_code')
         try:
             verification_input = WebDriverWait(self._selenium_driver, 10).until(
                 EC.presence_of_element_located((By.XPATH, "//input[@name='authCode']"))
@@ -120,13 +265,28 @@ class PartifulBot:
             self._save_driver_screenshot()  # Save a screenshot for debugging
             raise e("Login button was not clickable, cannot proceed")
             
+        phases.next('wait_for_login')
         logging.info("Waiting for login to complete...")
         time.sleep(10) # wait for page to load
-        self._save_driver_screenshot()
-        self._store_driver_logs() # store logs for debugging
-        self.set_bearer_token() # set bearer token using network logs
+        self._save_driver_screenshot(failure=False)  # only kept when debug artifacts are on
+        peak_rss = self._rss_sampler.peak
+        self.login_metrics = {
+            'page_load_s': round(page_load_s, 3),
+            'login_s': round(time.perf_counter() - login_start, 3),
+            'peak_rss_mb': round(peak_rss / 2**20, 1) if peak_rss is not None else None,
+            'lean_browser': self.lean_browser,
+        }
+        logging.info(f"Login metrics: {self.login_metrics}")
+        phases.next('bearer_token')
+        self._store_driver_logs() # parse network logs, kept for debugging only when enabled
+        try:
+            self.set_bearer_token() # set bearer token using network logs
+        except Exception:
+            self._save_failure_artifacts()
+            raise
         # TODO: can elegantly set default user_id 
         if self._bearer_token is None:
+            self._save_failure_artifacts()
             raise ValueError("Bearer token not found in network logs. Please check the login process. You will not be able to use some partiful functionalities")
 
     def get_verification_code(self) -> str:
@@ -158,9 +318,8 @@ class PartifulBot:
                 continue
         # Filter out logs that are not relevant
         
-        # Save logs to a file for debugging
-        with open(f"logs/driver_logs/{datetime.now().strftime('%Y%m%d_%H%M%S')}.json", "w") as log_file:
-            json.dump(self._driver_logs, log_file, indent=4)
+        # Written asynchronously, and only when debug artifacts are enabled
+        self._driver_logs_saved = self._artifacts.save_json('driver_logs', self._driver_logs)
 
     def set_bearer_token(self):
         """
@@ -188,9 +347,24 @@ class PartifulBot:
             time.sleep(5)  # Wait for the page to reload
         raise Exception("Bearer token not found in network logs after multiple attempts.")
 
-    def _save_driver_screenshot(self):
-        screenshot_name = f"logs/screenshots/{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        self._selenium_driver.save_screenshot(screenshot_name)  # Save a screenshot for debugging
+    def _save_driver_screenshot(self, failure: bool = True):
+        """
+        Capture a screenshot for debugging; the file is written on the artifact writer thread.
+        Failure screenshots are flushed before returning, since the caller is about to raise.
+        """
+        if not self._artifacts.wants(failure):
+            return
+        self._artifacts.save_bytes('screenshots', self._selenium_driver.get_screenshot_as_png(), '.png', failure=failure)
+        if failure:
+            self._artifacts.flush()
+
+    def _save_failure_artifacts(self):
+        """Keep the screenshot and driver logs of a failed login."""
+        self._save_driver_screenshot()
+        if not self._driver_logs_saved:  # already written by _store_driver_logs in debug mode
+            self._driver_logs_saved = self._artifacts.save_json('driver_logs', self._driver_logs, failure=True)
+        # written before the error propagates, or the daemon writer may die with the process
+        self._artifacts.flush()
 
     def __enter__(self):
         self._selenium_driver = self._setup_driver()
@@ -198,3 +372,4 @@ class PartifulBot:
      
     def __exit__(self, exc_type, exc_value, traceback):
         self._selenium_driver.quit()
+        self._artifacts.flush()
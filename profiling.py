@@ -0,0 +1,270 @@
+"""
+Opt-in profiling of PartifulAPI batches and PartifulBot logins.
+
+Hot paths are wrapped in profiling.section(tag) - HTTP sends, JSON parsing and
+pydantic building per endpoint in partiful_api, login phases in partiful_bot, jobs in
+job_runner/worker_fleet. Outside a profiled run a section is a single global lookup.
+Inside one, each section records its count and wall time (and net traced memory when
+memory tracing is on), and samples are tagged with the innermost open section of the
+thread they came from.
+
+A run is started with profile_run(name). Only a fraction of runs are profiled,
+PARTIFUL_PROFILE (e.g. 0.05; 1 profiles every run, unset/0 none), so it can stay on
+in production. Modes (PARTIFUL_PROFILE_MODE):
+    sample    a background thread samples every thread's stack every `interval`
+              seconds (low overhead, default); writes <report>.collapsed for flamegraphs
+    cprofile  deterministic cProfile of the thread that opened the run; writes <report>.pstats
+With memory on (PARTIFUL_PROFILE_MEMORY, default 1) tracemalloc snapshots taken at the
+start and end of the run are diffed into the report's top allocations.
+
+Each profiled run writes <output_dir>/<name>_<timestamp>_<pid>.json.
+
+Usage:
+    with profiling.profile_run('nightly_batch', rate=1.0):
+        run_batch(api)
+"""
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Any, Dict, List
+
+PROFILE_ENV_VAR = 'PARTIFUL_PROFILE'
+PROFILE_MODE_ENV_VAR = 'PARTIFUL_PROFILE_MODE'
+PROFILE_MEMORY_ENV_VAR = 'PARTIFUL_PROFILE_MEMORY'
+MODES = ('sample', 'cprofile')
+UNTAGGED = '-'
+
+_active = None  # the ProfileRun in progress in this process, if any
+_active_lock = threading.Lock()
+_NULL_SECTION = nullcontext()
+
+
+class _Section:
+    __slots__ = ('run', 'tag', 'start', 'memory_start')
+
+    def __init__(self, run: 'ProfileRun', tag: str):
+        self.run = run
+        self.tag = tag
+
+    def __enter__(self):
+        self.run._tags.setdefault(threading.get_ident(), []).append(self.tag)
+        self.memory_start = tracemalloc.get_traced_memory()[0] if self.run.memory else 0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        memory_delta = tracemalloc.get_traced_memory()[0] - self.memory_start if self.run.memory else 0
+        self.run._tags[threading.get_ident()].pop()
+        self.run._record(self.tag, elapsed, memory_delta)
+        return False
+
+
+class ProfileRun:
+    def __init__(self, name: str, mode: str = 'sample', memory: bool = True, output_dir: str = 'logs/profiles',
+                 interval: float = 0.01, top: int = 25):
+        """
+        :param mode: 'sample' (stack sampler over all threads) or 'cprofile' (opening thread only)
+        :param memory: diff tracemalloc snapshots and track net memory per section
+        :param interval: seconds between stack samples in sample mode
+        :param top: functions/allocations listed in the report
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}' - supported modes: {MODES}")
+        self.name = name
+        self.mode = mode
+        self.memory = memory
+        self.output_dir = output_dir
+        self.interval = interval
+        self.top = top
+        self.sections: Dict[str, List[float]] = {}  # tag -> [count, total_s, max_s, net_bytes]
+        self.samples: Counter = Counter()  # (tag, collapsed stack) -> count
+        self.report_path = None
+        self._tags: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._profiler = None
+        self._started_tracing = False
+        self._memory_start = None
+        self._start = None
+
+    def section(self, tag: str) -> _Section:
+        return _Section(self, tag)
+
+    def _record(self, tag: str, elapsed: float, memory_delta: int):
+        with self._lock:
+            stats = self.sections.get(tag)
+            if stats is None:
+                self.sections[tag] = [1, elapsed, elapsed, memory_delta]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+                stats[3] += memory_delta
+
+    def start(self):
+        self._start = time.perf_counter()
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(1)
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            self._memory_start = tracemalloc.take_snapshot()
+        if self.mode == 'cprofile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._sampler = threading.Thread(target=self._sample_loop, name='profile-sampler', daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                # copy first: the owning thread may pop its last tag between a check and a read
+                tags = list(self._tags.get(ident) or ())
+                tag = tags[-1] if tags else UNTAGGED
+                stack = []
+                while frame is not None and len(stack) < 64:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[(tag, ';'.join(reversed(stack)))] += 1
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop collecting and write the report. Returns the report dict."""
+        wall_s = time.perf_counter() - self._start
+        report = {'name': self.name, 'pid': os.getpid(), 'mode': self.mode, 'wall_s': round(wall_s, 4),
+                  'sections': {tag: {'count': int(count), 'total_s': round(total, 4), 'max_s': round(longest, 4),
+                                     'mean_s': round(total / count, 6), **({'net_bytes': int(net)} if self.memory else {})}
+                               for tag, (count, total, longest, net) in
+                               sorted(self.sections.items(), key=lambda item: -item[1][1])}}
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}")
+
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(base + '.pstats')
+            stats = pstats.Stats(self._profiler).stats
+            ranked = sorted(stats.items(), key=lambda item: -item[1][3])[:self.top]
+            report['top_functions'] = [{'function': f"{os.path.basename(filename)}:{line}:{function}",
+                                        'calls': calls, 'tottime_s': round(tottime, 4), 'cumtime_s': round(cumtime, 4)}
+                                       for (filename, line, function), (_, calls, tottime, cumtime, _) in ranked]
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            by_tag = Counter()
+            with open(base + '.collapsed', 'w') as collapsed:
+                for (tag, stack), count in self.samples.items():
+                    by_tag[tag] += count
+                    collapsed.write(f"{tag};{stack} {count}\n")
+            report['samples'] = {'interval_s': self.interval, 'total': sum(by_tag.values()), 'by_tag': dict(by_tag.most_common())}
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            report['peak_traced_bytes'] = tracemalloc.get_traced_memory()[1]
+            report['top_allocations'] = [{'location': str(stat.traceback), 'size_diff': stat.size_diff,
+                                          'count_diff': stat.count_diff}
+                                         for stat in snapshot.compare_to(self._memory_start, 'lineno')[:self.top]]
+            self._memory_start = None
+            if self._started_tracing:
+                tracemalloc.stop()
+
+        self.report_path = base + '.json'
+        with open(self.report_path, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        logging.info(f"Profile report for {self.name} written to {self.report_path}")
+        return report
+
+
+def section(tag: str):
+    """Time a block under tag if a profiled run is active; a shared no-op context otherwise."""
+    run = _active
+    if run is None:
+        return _NULL_SECTION
+    return run.section(tag)
+
+
+class Phases:
+    """
+    Consecutive sections of one linear flow, e.g. login steps: next(tag) closes the
+    current phase and opens prefix:tag. Call end() (in a finally) to close the last one.
+    """
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._current = None
+
+    def next(self, tag: str):
+        self.end()
+        self._current = section(f'{self.prefix}:{tag}')
+        self._current.__enter__()
+
+    def end(self):
+        if self._current is not None:
+            current, self._current = self._current, None
+            current.__exit__(None, None, None)
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    return default if value is None else value not in ('', '0')
+
+
+@contextmanager
+def profile_run(name: str,
+                rate: float = None,
+                mode: str = None,
+                memory: bool = None,
+                output_dir: str = 'logs/profiles',
+                interval: float = 0.01,
+                ):
+    """
+    Profile the block with probability rate, yielding the ProfileRun (or None when not
+    sampled). Only one run is active per process: a run opened inside another is not
+    profiled separately, its sections go to the outer run.
+
+    :param rate: fraction of runs profiled, defaults to PARTIFUL_PROFILE (0 if unset)
+    :param mode: 'sample' or 'cprofile', defaults to PARTIFUL_PROFILE_MODE or 'sample'
+    :param memory: tracemalloc tracing, defaults to PARTIFUL_PROFILE_MEMORY or on
+    """
+    global _active
+    if rate is None:
+        rate = float(os.environ.get(PROFILE_ENV_VAR) or 0)
+    if rate <= 0 or random.random() >= rate:
+        yield None
+        return
+    with _active_lock:
+        if _active is not None:
+            run = None
+        else:
+            run = _active = ProfileRun(name, mode=mode or os.environ.get(PROFILE_MODE_ENV_VAR) or 'sample',
+                                       memory=memory if memory is not None else _env_flag(PROFILE_MEMORY_ENV_VAR, True),
+                                       output_dir=output_dir, interval=interval)
+    if run is None:
+        yield None
+        return
+    try:
+        run.start()
+    except Exception:
+        _active = None
+        raise
+    try:
+        yield run
+    finally:
+        _active = None
+        try:
+            run.stop()
+        except Exception as e:
+            logging.error(f"Could not write profile report for {name}: {e}")
@@ -74,3 +74,33 @@ def test_event_non_utc_timezone_fails():
         Event(start_date_utc=test_date)
 
 
+
+def test_guest_records_from_csv():
+    from Partiful_Types import guest_records, GuestRecord
+    csv_text = "Name,Status,RSVP Date,Phone Number\nAlex,GOING,2025-05-01,+15551234567\nSam,WAITLIST,2025-05-02,\n"
+    records = list(guest_records(csv_text))
+    assert records[0] == GuestRecord("+15551234567", "Alex", "GOING", "2025-05-01")
+    assert records[1].guest_id is None  # never falls back to the name
+    assert records[0].status is list(guest_records(csv_text))[0].status  # interned
+    assert list(guest_records("")) == []
+
+def test_identified_guest_records_skip_or_reject_guests_without_ids():
+    from Partiful_Types import identified_guest_records
+    csv_text = "Name,Status,Phone Number\nAlex,GOING,+15551234567\nSam,WAITLIST,\n"
+    assert [record.name for record in identified_guest_records(csv_text)] == ["Alex"]
+    with pytest.raises(ValueError):
+        list(identified_guest_records("Name,Status\nSam,GOING\nSam,DECLINED\n"))
+    assert list(identified_guest_records("Name,Status\n")) == []
+
+def test_mutual_and_rsvp_records():
+    from Partiful_Types import mutual_records, rsvp_records, MutualRecord
+    mutuals = {"result": {"data": ["u1", {"id": "u2", "name": "Bo"}]}}
+    assert list(mutual_records(mutuals)) == [MutualRecord("u1", None), MutualRecord("u2", "Bo")]
+    mixed = {"result": {"data": [{"user": {"id": "u3"}}, {"uid": "u4"}, {"name": "no id"}]}}
+    assert [record.user_id for record in mutual_records(mixed)] == ["u3", "u4"]
+    assert list(mutual_records({"result": {}})) == []
+    rsvps = {"result": {"data": [{"event": {"id": "e1", "title": "Party", "timezone": "America/Los_Angeles"},
+                                  "guest": {"status": "GOING"}}]}}
+    record = next(rsvp_records(rsvps))
+    assert (record.event_id, record.status, record.timezone) == ("e1", "GOING", "America/Los_Angeles")
+    assert not hasattr(record, "__dict__")
@@ -0,0 +1,103 @@
+import gzip
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from cassette import Cassette, SCRUBBED
+from partiful_api import PartifulAPI
+
+MUTUALS_URL = "https://api.partiful.com/getMutuals"
+
+
+@pytest.fixture
+def api():
+    fake_profile = MagicMock()
+    fake_profile.user_id = 'test_user'
+    return PartifulAPI(default_profile=fake_profile, auth_token='secret_token')
+
+
+@pytest.fixture
+def recorded(api, tmp_path, requests_mock):
+    """A cassette holding two getMutuals calls."""
+    requests_mock.post(MUTUALS_URL, json={"result": {"data": ["user1"]}, "token": "leaked"},
+                       headers={"Content-Type": "application/json"})
+    cassette = Cassette(str(tmp_path / "mutuals.jsonl.gz"))
+    with cassette.record(api):
+        api.get_mutuals()
+        api.get_mutuals(user_id='other_user')
+    return cassette
+
+
+def test_record_writes_sanitized_gzip_jsonl(api, recorded):
+    """Test recording captures each interaction with the token and secret fields scrubbed."""
+    with gzip.open(recorded.path, 'rt') as cassette_file:
+        raw = cassette_file.read()
+    assert 'secret_token' not in raw and 'leaked' not in raw
+    interactions = recorded.load()
+    assert [i['url'] for i in interactions] == [MUTUALS_URL, MUTUALS_URL]
+    assert interactions[0]['status'] == 200
+    assert json.loads(interactions[1]['request_body'])['data']['userId'] == 'other_user'
+    assert json.loads(interactions[0]['body'])['token'] == SCRUBBED
+    assert api.cassette is None
+
+
+def test_replay_serves_recorded_responses_offline(api, recorded, requests_mock):
+    """Test replay answers call_api from the cassette without touching the network."""
+    requests_mock.reset()
+    with recorded.replay(api, speed=0):
+        assert api.get_mutuals()['result']['data'] == ["user1"]
+        api.get_mutuals()
+        with pytest.raises(LookupError):
+            api.get_mutuals()
+    assert requests_mock.call_count == 0
+
+
+def test_replay_matches_request_body(api, tmp_path, requests_mock):
+    """Test calls with different bodies get their own recordings, whatever order they replay in."""
+    for user_id in ('test_user', 'other_user'):
+        requests_mock.post(MUTUALS_URL, additional_matcher=lambda request, user_id=user_id: user_id in request.text,
+                           json={"result": {"data": [f"mutual_of_{user_id}"]}},
+                           headers={"Content-Type": "application/json"})
+    cassette = Cassette(str(tmp_path / "mutuals.jsonl.gz"))
+    with cassette.record(api):
+        api.get_mutuals()
+        api.get_mutuals(user_id='other_user')
+    with cassette.replay(api, speed=0):
+        assert api.get_mutuals(user_id='other_user')['result']['data'] == ["mutual_of_other_user"]
+        assert api.get_mutuals()['result']['data'] == ["mutual_of_test_user"]
+    with cassette.replay(api, speed=0):
+        # an unrecorded body falls back to the next recording for the url
+        assert api.get_mutuals(user_id='new_user')['result']['data'] == ["mutual_of_test_user"]
+        assert api.get_mutuals(user_id='other_user')['result']['data'] == ["mutual_of_other_user"]
+        with pytest.raises(LookupError):
+            api.get_mutuals()
+
+
+def test_replay_repeat_cycles_recordings(api, recorded):
+    """Test repeat=True keeps serving a short cassette for a long load test."""
+    with recorded.replay(api, speed=0, repeat=True):
+        for _ in range(5):
+            assert api.get_mutuals()['result']['data'] == ["user1"]
+
+
+def test_replay_speed_scales_latency(api, tmp_path):
+    """Test recorded latency is divided by the speed multiplier."""
+    cassette = Cassette(str(tmp_path / "slow.jsonl.gz"))
+    with gzip.open(cassette.path, 'wt') as cassette_file:
+        cassette_file.write(json.dumps({'offset': 0, 'method': 'GET', 'url': MUTUALS_URL, 'request_body': None,
+                                        'status': 200, 'headers': {'Content-Type': 'application/json'},
+                                        'body': '{"result": 1}', 'elapsed': 0.4}) + '\n')
+    with cassette.replay(api, speed=4):
+        start = time.monotonic()
+        api.call_api(MUTUALS_URL)
+        assert 0.08 <= time.monotonic() - start < 0.3
+
+
+def test_drive_reissues_recorded_calls(api, recorded):
+    """Test drive replays the recorded call pattern through call_api."""
+    with recorded.replay(api, speed=0):
+        stats = recorded.drive(api, speed=0, concurrency=2)
+    assert stats['calls'] == 2
+    assert stats['errors'] == 0
@@ -0,0 +1,71 @@
+import gzip
+import zlib
+import pytest
+import requests
+from unittest.mock import MagicMock
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+import compression
+from compression import StreamDecoder, CompressionStats, accept_encoding, gzip_body
+
+PAYLOAD = b'{"result": {"data": [' + b'"guest", ' * 5000 + b'"last"]}}'
+
+def chunked(data: bytes, size: int = 97):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def decode_in_chunks(data: bytes, encoding: str) -> bytes:
+    decoder = StreamDecoder(encoding)
+    return b''.join(decoder.decompress(chunk) for chunk in chunked(data)) + decoder.flush()
+
+def test_accept_encoding_only_lists_installed_decoders(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    monkeypatch.setattr(compression, "zstandard", None)
+    assert accept_encoding() == "gzip, deflate"
+    with pytest.raises(ValueError):
+        StreamDecoder("br")
+
+def test_stream_decode_gzip_and_deflate():
+    assert decode_in_chunks(gzip.compress(PAYLOAD), "gzip") == PAYLOAD
+    assert decode_in_chunks(zlib.compress(PAYLOAD), "deflate") == PAYLOAD
+    raw_deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    assert decode_in_chunks(raw_deflate.compress(PAYLOAD) + raw_deflate.flush(), "deflate") == PAYLOAD
+    assert decode_in_chunks(PAYLOAD, None) == PAYLOAD
+
+def test_stream_decode_brotli():
+    brotli = pytest.importorskip("brotli")
+    assert "br" in accept_encoding()
+    assert decode_in_chunks(brotli.compress(PAYLOAD), "br") == PAYLOAD
+
+def test_stream_decode_zstd():
+    zstandard = pytest.importorskip("zstandard")
+    assert "zstd" in accept_encoding()
+    assert decode_in_chunks(zstandard.ZstdCompressor().compress(PAYLOAD), "zstd") == PAYLOAD
+
+def test_stream_decode_stacked_encodings():
+    data = gzip.compress(zlib.compress(PAYLOAD))
+    assert decode_in_chunks(data, "deflate, gzip") == PAYLOAD
+
+def test_gzip_body_roundtrip():
+    assert gzip.decompress(gzip_body(PAYLOAD)) == PAYLOAD
+
+def test_compression_stats():
+    stats = CompressionStats()
+    stats.record_request("createEvent", 2000, 500)
+    stats.record_response("createEvent", 100, 400)
+    snapshot = stats.snapshot()["createEvent"]
+    assert snapshot["requests"] == 1
+    assert snapshot["request_bytes"] == 2000
+    assert snapshot["request_bytes_sent"] == 500
+    assert snapshot["response_ratio"] == 4.0
+
+@pytest.mark.parametrize("raw_error, expected", [
+    (ProtocolError("Connection broken: reset"), requests.exceptions.ConnectionError),
+    (ReadTimeoutError(None, "https://api.partiful.com/", "Read timed out."), requests.exceptions.ReadTimeout),
+])
+def test_read_body_raises_requests_exceptions(raw_error, expected):
+    def broken_stream(chunk_size, decode_content):
+        yield b"partial"
+        raise raw_error
+    response = MagicMock(headers={})
+    response.raw.stream = broken_stream
+    with pytest.raises(expected):
+        compression.read_body(response)
@@ -0,0 +1,63 @@
+import gzip
+import json
+import os
+import time
+from debug_artifacts import ArtifactWriter
+
+def list_kind(root, kind):
+    return sorted(os.listdir(root / kind)) if (root / kind).exists() else []
+
+def test_skips_non_failure_artifacts_unless_debug(tmp_path, monkeypatch):
+    monkeypatch.delenv("PARTIFUL_DEBUG_ARTIFACTS", raising=False)
+    writer = ArtifactWriter(root=str(tmp_path))
+    assert writer.save_json("driver_logs", [{"a": 1}]) is False
+    assert writer.save_bytes("screenshots", b"png", ".png", failure=True) is True
+    writer.flush()
+    assert list_kind(tmp_path, "driver_logs") == []
+    assert len(list_kind(tmp_path, "screenshots")) == 1
+
+    monkeypatch.setenv("PARTIFUL_DEBUG_ARTIFACTS", "1")
+    assert ArtifactWriter(root=str(tmp_path)).wants() is True
+
+def test_json_is_gzipped(tmp_path):
+    writer = ArtifactWriter(root=str(tmp_path), debug=True)
+    writer.save_json("driver_logs", [{"method": "Network.requestWillBeSent"}], tag="login")
+    writer.flush()
+    [name] = list_kind(tmp_path, "driver_logs")
+    assert name.endswith("_login.json.gz")
+    with gzip.open(tmp_path / "driver_logs" / name) as log_file:
+        assert json.load(log_file) == [{"method": "Network.requestWillBeSent"}]
+
+def test_retention_by_count_and_size(tmp_path):
+    writer = ArtifactWriter(root=str(tmp_path), debug=True, max_count=3)
+    for i in range(6):
+        writer.save_bytes("screenshots", b"x" * 10, ".png")
+    writer.flush()
+    assert len(list_kind(tmp_path, "screenshots")) == 3
+
+    writer = ArtifactWriter(root=str(tmp_path), debug=True, max_bytes=25)
+    writer.save_bytes("screenshots", b"x" * 10, ".png")
+    writer.flush()
+    assert len(list_kind(tmp_path, "screenshots")) == 2
+
+def test_retention_by_age(tmp_path):
+    (tmp_path / "screenshots").mkdir()
+    stale = tmp_path / "screenshots" / "old.png"
+    stale.write_bytes(b"old")
+    os.utime(stale, (time.time() - 3600, time.time() - 3600))
+    writer = ArtifactWriter(root=str(tmp_path), debug=True, max_age_s=60)
+    writer.save_bytes("screenshots", b"new", ".png")
+    writer.flush()
+    assert "old.png" not in list_kind(tmp_path, "screenshots")
+    assert len(list_kind(tmp_path, "screenshots")) == 1
+
+def test_failed_render_leaves_no_partial_file(tmp_path):
+    class Unprintable:
+        def __str__(self):
+            raise RuntimeError("cannot render")
+    writer = ArtifactWriter(root=str(tmp_path), debug=True)
+    writer.save_json("driver_logs", [Unprintable()])
+    writer.save_json("driver_logs", [{"ok": True}])
+    writer.flush()
+    [name] = list_kind(tmp_path, "driver_logs")
+    assert name.endswith(".json.gz")
@@ -0,0 +1,172 @@
+import json
+import pytest
+import requests
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from event_outbox import EventOutbox, DONE, DEAD, FAILED, IN_DOUBT, PENDING
+from partiful_api import APIError, DeadlineExceeded
+
+START = datetime(2025, 6, 1, 18, 0, tzinfo=timezone.utc)
+
+@pytest.fixture
+def api():
+    api = MagicMock()
+    api.create_event.side_effect = lambda **kwargs: f"https://partiful.com/e/{kwargs['event_name']}"
+    return api
+
+def read_log(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_submit_is_durable_before_sending(api, tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    outbox = EventOutbox(api, str(path))
+    intent_id = outbox.submit(event_name="Launch", event_date=START, max_capacity=50)
+    assert read_log(path)[0]["type"] == "intent"
+    assert outbox.status(intent_id) == PENDING
+    api.create_event.assert_not_called()
+
+    assert outbox.drain_once() == 1
+    assert outbox.result(intent_id) == "https://partiful.com/e/Launch"
+    assert api.create_event.call_args.kwargs["event_date"] == START
+    assert [r["type"] for r in read_log(path)] == ["intent", "attempt", "done"]
+    outbox.close()
+
+def test_idempotency_key_dedupes_submissions(api, tmp_path):
+    outbox = EventOutbox(api, str(tmp_path / "outbox.jsonl"))
+    first = outbox.submit(event_name="A", event_date=START, max_capacity=5, idempotency_key="upstream-1")
+    assert outbox.submit(event_name="A", event_date=START, max_capacity=5, idempotency_key="upstream-1") == first
+    outbox.drain_once()
+    outbox.close()
+    # also across restarts
+    outbox = EventOutbox(api, str(tmp_path / "outbox.jsonl"))
+    assert outbox.submit(event_name="A", event_date=START, max_capacity=5, idempotency_key="upstream-1") == first
+    assert outbox.drain_once() == 0
+    assert api.create_event.call_count == 1
+    outbox.close()
+
+def test_crash_recovery_resumes_pending_and_never_retries_in_flight(api, tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    path.write_text(
+        json.dumps({"type": "intent", "id": "sent", "args": {"event_name": "X", "event_date": START.isoformat(), "max_capacity": 1}}) + "\n" +
+        json.dumps({"type": "intent", "id": "queued", "args": {"event_name": "Y", "event_date": START.isoformat(), "max_capacity": 1}}) + "\n" +
+        json.dumps({"type": "attempt", "id": "sent"}) + "\n" +
+        '{"type": "done", "id": "se'  # torn write
+    )
+    outbox = EventOutbox(api, str(path))
+    assert outbox.status("sent") == IN_DOUBT
+    assert outbox.drain_once() == 1
+    assert outbox.status("queued") == DONE
+    assert [c.kwargs["event_name"] for c in api.create_event.call_args_list] == ["Y"]
+    with pytest.raises(RuntimeError):
+        outbox.wait("sent", timeout=0)
+
+    outbox.retry_in_doubt("sent")
+    outbox.drain_once()
+    assert outbox.result("sent") == "https://partiful.com/e/X"
+    outbox.close()
+
+def test_failures_retry_then_go_dead(api, tmp_path):
+    api.create_event.side_effect = APIError("Error calling API: 429", 429)
+    outbox = EventOutbox(api, str(tmp_path / "outbox.jsonl"), max_attempts=2, retry_backoff=0)
+    intent_id = outbox.submit(event_name="A", event_date=START, max_capacity=5)
+    outbox.drain_once()
+    outbox.drain_once()
+    assert outbox.status(intent_id) == DEAD
+    assert outbox.drain_once() == 0
+    outbox.close()
+
+def test_background_worker_and_compaction(api, tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    created = []
+    with EventOutbox(api, str(path), poll_interval=0.01, on_created=lambda i, url: created.append(url)) as outbox:
+        ids = [outbox.submit(event_name=f"E{i}", event_date=START, max_capacity=5) for i in range(3)]
+        assert [outbox.wait(i, timeout=5) for i in ids] == [f"https://partiful.com/e/E{i}" for i in range(3)]
+        outbox.compact()
+    assert sorted(created) == [f"https://partiful.com/e/E{i}" for i in range(3)]
+    assert [r["type"] for r in read_log(path)] == ["intent", "done"] * 3
+    assert EventOutbox(api, str(path)).result(ids[0]) == "https://partiful.com/e/E0"
+
+def test_ambiguous_failures_go_in_doubt_instead_of_retrying(api, tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    read_timeout = DeadlineExceeded("Time budget exhausted")
+    read_timeout.__cause__ = requests.exceptions.ReadTimeout()
+    outbox = EventOutbox(api, str(path), retry_backoff=0)
+    for error in (read_timeout, requests.exceptions.ConnectionError("Connection reset by peer"),
+                  APIError("Error calling API: 500", 500),
+                  ValueError("Unsupported Content-Encoding 'snappy'")):  # raised reading a 200 response
+        api.create_event.side_effect = error
+        intent_id = outbox.submit(event_name="A", event_date=START, max_capacity=5)
+        outbox.drain_once()
+        assert outbox.status(intent_id) == IN_DOUBT
+    assert outbox.drain_once() == 0
+    outbox.close()
+    # in_doubt survives a restart
+    assert EventOutbox(api, str(path)).status(intent_id) == IN_DOUBT
+
+def test_connect_failure_is_retried(api, tmp_path):
+    connect_timeout = DeadlineExceeded("Time budget exhausted")
+    connect_timeout.__cause__ = requests.exceptions.ConnectTimeout()
+    api.create_event.side_effect = [connect_timeout, "https://partiful.com/e/A"]
+    outbox = EventOutbox(api, str(tmp_path / "outbox.jsonl"), retry_backoff=0)
+    intent_id = outbox.submit(event_name="A", event_date=START, max_capacity=5)
+    outbox.drain_once()
+    assert outbox.status(intent_id) == FAILED
+    outbox.drain_once()
+    assert outbox.result(intent_id) == "https://partiful.com/e/A"
+    outbox.close()
+
+def test_attempt_is_logged_per_intent_right_before_sending(api, tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    outbox = EventOutbox(api, str(path), batch_size=3)
+    ids = [outbox.submit(event_name=f"E{i}", event_date=START, max_capacity=5) for i in range(3)]
+
+    def crash_on_second(**kwargs):
+        if kwargs["event_name"] == "E1":
+            raise KeyboardInterrupt  # process dies mid-batch
+        return f"https://partiful.com/e/{kwargs['event_name']}"
+    api.create_event.side_effect = crash_on_second
+    with pytest.raises(KeyboardInterrupt):
+        outbox.drain_once()
+    outbox.close()
+    recovered = EventOutbox(api, str(path))
+    assert [recovered.status(i) for i in ids] == [DONE, IN_DOUBT, PENDING]
+    recovered.close()
+
+def test_torn_tail_is_truncated_before_appending(api, tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    outbox = EventOutbox(api, str(path))
+    first = outbox.submit(event_name="A", event_date=START, max_capacity=5)
+    outbox.close()
+    with open(path, "a") as log_file:
+        log_file.write('{"type": "attempt", "id": "')  # crash mid-write
+    outbox = EventOutbox(api, str(path))
+    second = outbox.submit(event_name="B", event_date=START, max_capacity=5)
+    outbox.close()
+    recovered = EventOutbox(api, str(path))
+    assert recovered.status(first) == recovered.status(second) == PENDING
+    recovered.close()
+
+def test_invalid_event_fails_without_going_in_doubt(tmp_path, requests_mock):
+    from partiful_api import PartifulAPI
+    api = PartifulAPI(default_profile=MagicMock(user_id="test_user"), auth_token="test_token")
+    outbox = EventOutbox(api, str(tmp_path / "outbox.jsonl"), max_attempts=1)
+    intent_id = outbox.submit(event_name="A", event_date=START, max_capacity="lots")
+    outbox.drain_once()
+    assert outbox.status(intent_id) == DEAD
+    assert requests_mock.call_count == 0
+    outbox.close()
+
+def test_compaction_keeps_attempt_counts(api, tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    api.create_event.side_effect = APIError("Error calling API: 429", 429)
+    outbox = EventOutbox(api, str(path), max_attempts=2, retry_backoff=0)
+    intent_id = outbox.submit(event_name="A", event_date=START, max_capacity=5)
+    outbox.drain_once()
+    outbox.compact()
+    outbox.close()
+    outbox = EventOutbox(api, str(path), max_attempts=2, retry_backoff=0)
+    assert outbox.status(intent_id) == FAILED
+    outbox.drain_once()
+    assert outbox.status(intent_id) == DEAD
+    assert api.create_event.call_count == 2
+    outbox.close()
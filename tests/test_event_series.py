@@ -0,0 +1,143 @@
+import json
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from event_series import ATTEMPT, CREATED, FAILED, SKIPPED, EventSeries, SeriesScheduler
+
+LA = ZoneInfo("America/Los_Angeles")
+NOW = datetime(2025, 1, 1, tzinfo=LA).timestamp()
+
+
+@pytest.fixture
+def api():
+    fake_api = MagicMock()
+    fake_api.timezone = LA
+    fake_api.create_event.side_effect = lambda name, date, capacity, **kwargs: f"https://partiful.com/e/{name}-{date:%m%d}"
+    return fake_api
+
+
+def weekly(series_id="run-club", count=4, priority=0, first_start=datetime(2025, 3, 2, 19, 0)):
+    return EventSeries(series_id, series_id, f"FREQ=WEEKLY;COUNT={count}", first_start=first_start,
+                       max_capacity=30, duration=timedelta(hours=2), priority=priority)
+
+
+def test_occurrences_keep_wall_time_across_dst():
+    """Test a weekly 7pm series stays at 7pm local when DST starts."""
+    specs = list(weekly(count=3).occurrences(LA))
+    assert [spec.event_date.hour for spec in specs] == [19, 19, 19]
+    assert [spec.event_date.utcoffset() for spec in specs] == [timedelta(hours=-8), timedelta(hours=-7),
+                                                                timedelta(hours=-7)]
+    assert specs[0].end_date == specs[0].event_date + timedelta(hours=2)
+
+
+def test_occurrence_in_dst_gap_moves_forward():
+    """Test a 2:30am occurrence on the spring-forward day becomes 3:30am PDT."""
+    series = EventSeries("early", "Early", "FREQ=DAILY;COUNT=2", datetime(2025, 3, 8, 2, 30), max_capacity=5)
+    gap_day = list(series.occurrences(LA))[1]
+    assert (gap_day.event_date.hour, gap_day.event_date.minute) == (3, 30)
+    assert gap_day.event_date.utcoffset() == timedelta(hours=-7)
+
+
+def test_unbounded_series_expands_lazily_from_index():
+    """Test an endless rule is expanded lazily, resumed from start_index and cut at until."""
+    series = EventSeries("daily", "Daily", "FREQ=DAILY", datetime(2025, 1, 1, 9, 0), max_capacity=5)
+    until = datetime(2025, 1, 10, 12, 0, tzinfo=LA)
+    specs = list(series.occurrences(LA, start_index=5, until=until))
+    assert [spec.index for spec in specs] == [5, 6, 7, 8, 9]
+    assert specs[0].event_date.day == 6
+
+
+def test_scheduler_submits_in_priority_then_date_order(api, tmp_path):
+    """Test occurrences across series go out by priority, then start time."""
+    scheduler = SeriesScheduler(api, str(tmp_path / "series.jsonl"), rate=1000, clock=lambda: NOW)
+    scheduler.add(weekly("low", count=2, priority=1))
+    scheduler.add(weekly("high", count=2, priority=0, first_start=datetime(2025, 3, 5, 19, 0)))
+    summary = scheduler.run()
+    assert summary == {CREATED: 4, FAILED: 0, SKIPPED: 0}
+    names = [call.args[0] for call in api.create_event.call_args_list]
+    assert names == ["high", "high", "low", "low"]
+
+
+def test_scheduler_resumes_after_interruption(api, tmp_path):
+    """Test a second run continues each series after its last logged occurrence."""
+    log_path = str(tmp_path / "series.jsonl")
+    with SeriesScheduler(api, log_path, rate=1000, clock=lambda: NOW) as scheduler:
+        scheduler.add(weekly(count=5))
+        assert scheduler.run(limit=2)[CREATED] == 2
+    with SeriesScheduler(api, log_path, rate=1000, clock=lambda: NOW) as scheduler:
+        scheduler.add(weekly(count=5))
+        assert scheduler.next_index("run-club") == 2
+        assert scheduler.run()[CREATED] == 3
+    dates = [call.args[1] for call in api.create_event.call_args_list]
+    assert len(dates) == len(set(dates)) == 5
+
+
+def test_scheduler_logs_failures_without_retrying(api, tmp_path):
+    """Test a failed creation is logged and reported, and not retried on the next run."""
+    api.create_event.side_effect = Exception("rate limited")
+    log_path = str(tmp_path / "series.jsonl")
+    scheduler = SeriesScheduler(api, log_path, rate=1000, clock=lambda: NOW)
+    scheduler.add(weekly(count=1))
+    assert scheduler.run()[FAILED] == 1
+    scheduler.close()
+    resumed = SeriesScheduler(api, log_path, rate=1000, clock=lambda: NOW)
+    resumed.add(weekly(count=1))
+    assert resumed.run() == {CREATED: 0, FAILED: 0, SKIPPED: 0}
+    assert "rate limited" in resumed.failed()[0]['error']
+    with open(log_path) as log_file:
+        assert [json.loads(line)['status'] for line in log_file] == [ATTEMPT, FAILED]
+
+
+def test_scheduler_never_resends_attempt_without_outcome(api, tmp_path):
+    """Test an occurrence whose create_event was interrupted is reported in doubt, not sent again."""
+    log_path = str(tmp_path / "series.jsonl")
+    api.create_event.side_effect = KeyboardInterrupt  # process dies mid-call
+    with SeriesScheduler(api, log_path, rate=1000, clock=lambda: NOW) as scheduler:
+        scheduler.add(weekly(count=2))
+        with pytest.raises(KeyboardInterrupt):
+            scheduler.run()
+    api.create_event.reset_mock(side_effect=True)
+    api.create_event.return_value = "https://partiful.com/e/second"
+    with SeriesScheduler(api, log_path, rate=1000, clock=lambda: NOW) as resumed:
+        resumed.add(weekly(count=2))
+        assert [record['index'] for record in resumed.in_doubt()] == [0]
+        assert resumed.run() == {CREATED: 1, FAILED: 0, SKIPPED: 0}
+        assert resumed.in_doubt()[0]['index'] == 0
+    assert api.create_event.call_count == 1
+
+
+def test_scheduler_keeps_attempt_written_after_torn_tail(api, tmp_path):
+    """Test a torn last line is dropped, so an attempt appended after it survives the next replay."""
+    log_path = tmp_path / "series.jsonl"
+    log_path.write_text('{"series": "run-club", "ind')  # crash mid-write
+    api.create_event.side_effect = KeyboardInterrupt
+    with SeriesScheduler(api, str(log_path), rate=1000, clock=lambda: NOW) as scheduler:
+        scheduler.add(weekly(count=1))
+        with pytest.raises(KeyboardInterrupt):
+            scheduler.run()
+    with SeriesScheduler(api, str(log_path), rate=1000, clock=lambda: NOW) as resumed:
+        resumed.add(weekly(count=1))
+        assert [record['index'] for record in resumed.in_doubt()] == [0]
+        assert resumed.run() == {CREATED: 0, FAILED: 0, SKIPPED: 0}
+    assert api.create_event.call_count == 1
+
+
+def test_scheduler_skips_past_occurrences(api, tmp_path):
+    """Test occurrences that already started are skipped, not created."""
+    later = datetime(2025, 3, 12, tzinfo=LA).timestamp()
+    scheduler = SeriesScheduler(api, str(tmp_path / "series.jsonl"), rate=1000, clock=lambda: later)
+    scheduler.add(weekly(count=4))
+    assert scheduler.run() == {CREATED: 2, FAILED: 0, SKIPPED: 2}
+
+
+def test_scheduler_paces_requests(api, tmp_path):
+    """Test submissions are spread out at the configured rate instead of bursting."""
+    scheduler = SeriesScheduler(api, str(tmp_path / "series.jsonl"), rate=50, clock=lambda: NOW)
+    scheduler.add(weekly(count=5))
+    start = time.monotonic()
+    scheduler.run()
+    assert time.monotonic() - start >= 4 / 50
@@ -0,0 +1,58 @@
+import pytest
+from unittest.mock import MagicMock
+from guest_snapshots import (SnapshotStore, GuestDelta, export_guest_delta, merge_diff,
+                             ADDED, REMOVED, CHANGED)
+
+HEADER = "Name,Status,User Id\n"
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "snapshots"))
+
+def test_merge_diff():
+    old = [("a", "GOING", "A"), ("b", "MAYBE", "B"), ("d", "GOING", "D")]
+    new = [("a", "GOING", "A"), ("b", "GOING", "B"), ("c", "WAITLIST", "C")]
+    assert list(merge_diff(old, new)) == [
+        GuestDelta(CHANGED, "b", "B", "MAYBE", "GOING"),
+        GuestDelta(ADDED, "c", "C", None, "WAITLIST"),
+        GuestDelta(REMOVED, "d", "D", "GOING", None),
+    ]
+
+def test_export_guest_delta_between_snapshots(store):
+    api = MagicMock()
+    api.get_guests_csv.return_value = HEADER + "Alex,GOING,u1\nSam,MAYBE,u2\n"
+    first = list(export_guest_delta(api, "event1", store))
+    assert {d.guest_id for d in first} == {"u1", "u2"} and {d.change for d in first} == {ADDED}
+
+    assert list(export_guest_delta(api, "event1", store)) == []
+
+    api.get_guests_csv.return_value = HEADER + "Sam,GOING,u2\nRiley,WAITLIST,u3\n"
+    assert list(export_guest_delta(api, "event1", store)) == [
+        GuestDelta(REMOVED, "u1", "Alex", "GOING", None),
+        GuestDelta(CHANGED, "u2", "Sam", "MAYBE", "GOING"),
+        GuestDelta(ADDED, "u3", "Riley", None, "WAITLIST"),
+    ]
+    assert list(store.read("event1")) == [("u2", "GOING", "Sam"), ("u3", "WAITLIST", "Riley")]
+
+def test_snapshot_only_replaced_when_delta_fully_consumed(store):
+    api = MagicMock()
+    api.get_guests_csv.return_value = HEADER + "Alex,GOING,u1\nSam,MAYBE,u2\n"
+    deltas = export_guest_delta(api, "event1", store)
+    next(deltas)
+    deltas.close()  # import crashed part way
+    assert list(store.read("event1")) == []
+    assert len(list(export_guest_delta(api, "event1", store))) == 2
+
+def test_filtered_exports_keep_separate_snapshots(store):
+    api = MagicMock()
+    api.get_guests_csv.return_value = HEADER + "Alex,GOING,u1\nSam,MAYBE,u2\n"
+    list(export_guest_delta(api, "event1", store))
+    api.get_guests_csv.return_value = HEADER + "Alex,GOING,u1\n"
+    assert [d.change for d in export_guest_delta(api, "event1", store, statuses=["GOING"])] == [ADDED]
+
+def test_export_without_guest_ids_is_rejected(store):
+    api = MagicMock()
+    api.get_guests_csv.return_value = "Name,Status\nSam,GOING\nSam,DECLINED\n"
+    with pytest.raises(ValueError):
+        list(export_guest_delta(api, "e1", store))
+    assert list(store.read("e1")) == []
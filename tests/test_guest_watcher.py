@@ -0,0 +1,95 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from guest_watcher import GuestWatcher, GuestStatusChange, diff_statuses
+
+HEADER = "Name,Status,User Id\n"
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def make_watcher(api, clock, changes):
+    return GuestWatcher(api, callbacks=[changes.append], base_interval=100, min_interval=10,
+                        max_interval=1000, clock=clock)
+
+def test_diff_statuses():
+    changes = diff_statuses("e1", {"a": "GOING", "b": "MAYBE"}, {"a": "DECLINED", "c": "WAITLIST"})
+    assert set(changes) == {
+        GuestStatusChange("e1", "a", None, "GOING", "DECLINED"),
+        GuestStatusChange("e1", "c", None, None, "WAITLIST"),
+        GuestStatusChange("e1", "b", None, "MAYBE", None),
+    }
+
+def test_emits_changes_and_skips_unchanged_exports(clock):
+    api = MagicMock()
+    changes = []
+    watcher = make_watcher(api, clock, changes)
+    watcher.watch("e1")
+
+    api.get_guests_csv.return_value = HEADER + "Alex,GOING,u1\nSam,WAITLIST,u2\n"
+    assert watcher.poll_due() == 1
+    assert changes == []  # first export is the baseline
+
+    clock.now += 1000
+    watcher.poll_due()
+    assert watcher.stats["unchanged"] == 1
+
+    api.get_guests_csv.return_value = HEADER + "Alex,GOING,u1\nSam,GOING,u2\n"
+    clock.now += 1000
+    watcher.poll_due()
+    assert changes == [GuestStatusChange("e1", "u2", "Sam", "WAITLIST", "GOING")]
+
+def test_interval_backs_off_when_idle_and_speeds_up_on_change(clock):
+    api = MagicMock()
+    api.get_guests_csv.return_value = HEADER + "Alex,GOING,u1\n"
+    watcher = make_watcher(api, clock, [])
+    watcher.watch("e1")
+    watcher.poll_due()
+    watched = watcher._events["e1"]
+    assert watched.interval == 200
+
+    clock.now += 200
+    watcher.poll_due()
+    assert watched.interval == 400
+
+    api.get_guests_csv.return_value = HEADER + "Alex,DECLINED,u1\n"
+    clock.now += 400
+    watcher.poll_due()
+    assert watched.interval == 200
+
+def test_polls_faster_near_start(clock):
+    api = MagicMock()
+    api.get_guests_csv.return_value = HEADER
+    watcher = make_watcher(api, clock, [])
+    watcher.watch("e1", start_date=datetime.fromtimestamp(clock.now + 1500, tz=timezone.utc))
+    watcher.poll_due()
+    assert watcher._events["e1"].interval == 15
+
+def test_not_due_and_unwatched_events_are_not_polled(clock):
+    api = MagicMock()
+    api.get_guests_csv.return_value = HEADER
+    watcher = make_watcher(api, clock, [])
+    watcher.watch("e1")
+    watcher.poll_due()
+    assert watcher.poll_due() == 0
+    watcher.unwatch("e1")
+    clock.now += 10_000
+    assert watcher.poll_due() == 0
+    assert api.get_guests_csv.call_count == 1
+
+def test_export_without_guest_ids_is_skipped_not_merged(clock):
+    api = MagicMock()
+    changes = []
+    watcher = make_watcher(api, clock, changes)
+    watcher.watch("e1")
+    api.get_guests_csv.return_value = "Name,Status\nSam,GOING\nSam,DECLINED\n"
+    watcher.poll_due()
+    assert watcher.stats["errors"] == 1
+    assert changes == []
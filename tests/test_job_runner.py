@@ -0,0 +1,89 @@
+import json
+import time
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+from job_runner import JobRunner, run_job
+from partiful_api import PartifulAPI
+
+def write_jobs(path, jobs):
+    path.write_text("".join(json.dumps(job) + "\n" for job in jobs))
+
+def read_results(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+@pytest.fixture
+def api():
+    api = MagicMock()
+    api.create_event.return_value = "https://partiful.com/e/new_event"
+    api.get_guests_csv.return_value = "Name,Status\nA,GOING\n"
+    return api
+
+def test_run_job_parses_dates(api):
+    run_job(api, {"op": "create_event", "args": {"event_name": "Party", "event_date": "2025-06-01T18:00:00-07:00", "max_capacity": 10}})
+    kwargs = api.create_event.call_args.kwargs
+    assert isinstance(kwargs["event_date"], datetime)
+    assert kwargs["max_capacity"] == 10
+
+def test_run_job_unknown_op(api):
+    with pytest.raises(ValueError):
+        run_job(api, {"op": "delete_everything"})
+
+def test_runner_writes_results_and_failures(api, tmp_path):
+    jobs, output = tmp_path / "jobs.jsonl", tmp_path / "results.jsonl"
+    write_jobs(jobs, [
+        {"id": "a", "op": "get_guests_csv", "args": {"event_id": "e1"}},
+        {"id": "b", "op": "nope"},
+        {"id": "c", "op": "get_mutuals"},
+    ])
+    summary = JobRunner(api, str(output), concurrency=2).run(str(jobs))
+
+    assert summary == {"ok": 2, "failed": 1, "skipped": 0}
+    results = {r["id"]: r for r in read_results(output)}
+    assert results["a"]["result"] == "Name,Status\nA,GOING\n"
+    assert results["b"]["ok"] is False and "Unknown op" in results["b"]["error"]
+
+def test_runner_resumes_from_checkpoint(api, tmp_path):
+    jobs, output = tmp_path / "jobs.jsonl", tmp_path / "results.jsonl"
+    write_jobs(jobs, [{"id": str(i), "op": "get_rsvps"} for i in range(5)])
+    # Simulate a crashed run that finished lines 0 and 2, with a torn last write
+    (tmp_path / "results.jsonl.checkpoint").write_text("0\n2\n3")
+
+    summary = JobRunner(api, str(output)).run(str(jobs))
+
+    assert summary == {"ok": 3, "failed": 0, "skipped": 2}
+    assert sorted(r["offset"] for r in read_results(output)) == [1, 3, 4]
+    assert JobRunner(api, str(output)).run(str(jobs))["skipped"] == 5
+
+def test_runner_retries_failed_jobs_on_next_run(api, tmp_path):
+    jobs, output = tmp_path / "jobs.jsonl", tmp_path / "results.jsonl"
+    write_jobs(jobs, [{"id": "a", "op": "get_rsvps"}, {"id": "b", "op": "get_mutuals"}])
+    api.get_mutuals.side_effect = Exception("503 Service Unavailable")
+    assert JobRunner(api, str(output)).run(str(jobs)) == {"ok": 1, "failed": 1, "skipped": 0}
+
+    api.get_mutuals.side_effect = None
+    assert JobRunner(api, str(output)).run(str(jobs)) == {"ok": 1, "failed": 0, "skipped": 1}
+    assert [(r["id"], r["ok"]) for r in read_results(output)][-1] == ("b", True)
+
+def test_deadline_scope_applies_in_pool_threads(tmp_path, requests_mock):
+    """Test an api.deadline() scope around run() also bounds the jobs running on pool threads."""
+    requests_mock.post("https://api.partiful.com/getMutuals", json={"result": {"data": []}},
+                       headers={"Content-Type": "application/json"})
+    api = PartifulAPI(default_profile=MagicMock(user_id="test_user"), auth_token="test_token")
+    jobs, output = tmp_path / "jobs.jsonl", tmp_path / "results.jsonl"
+    write_jobs(jobs, [{"id": str(i), "op": "get_mutuals"} for i in range(4)])
+    with api.deadline(0.01):
+        time.sleep(0.02)
+        summary = JobRunner(api, str(output), concurrency=2).run(str(jobs))
+    assert summary["failed"] == 4
+    assert all(r["error"].startswith("DeadlineExceeded") for r in read_results(output))
+    assert requests_mock.call_count == 0
+
+def test_runner_checkpoints_jobs_that_can_never_succeed(api, tmp_path):
+    jobs, output = tmp_path / "jobs.jsonl", tmp_path / "results.jsonl"
+    jobs.write_text('{"id": "a", "op": "get_rsvps"}\n{not json\n{"id": "c", "op": "nope"}\n'
+                    '{"id": "d", "op": "get_mutuals", "args": {"bogus": 1}}\n')
+    api.get_mutuals.side_effect = TypeError("get_mutuals() got an unexpected keyword argument 'bogus'")
+    assert JobRunner(api, str(output)).run(str(jobs)) == {"ok": 1, "failed": 3, "skipped": 0}
+    assert [r["retryable"] for r in read_results(output)].count(True) == 0
+    assert JobRunner(api, str(output)).run(str(jobs)) == {"ok": 0, "failed": 0, "skipped": 4}
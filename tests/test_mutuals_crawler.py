@@ -0,0 +1,75 @@
+import pytest
+from unittest.mock import MagicMock
+from mutuals_crawler import MutualsCrawler, _Frontier
+
+GRAPH = {
+    "root": ["a", "b", "c"],
+    "a": ["root", "b", "d"],
+    "b": ["root", "a"],
+    "c": ["root", "e"],
+    "d": ["a", "f"],
+    "e": ["c"],
+    "f": ["d"],
+}
+
+def make_crawler(**kwargs):
+    return MutualsCrawler(MagicMock(), fetch_mutuals=lambda user_id: GRAPH[user_id], **kwargs)
+
+def test_crawl_depth_limit_and_unique_edges():
+    crawler = make_crawler(max_depth=2, concurrency=3)
+    assert crawler.crawl("root") == 6  # f is three hops away
+    edges = {frozenset(edge) for edge in crawler.edges()}
+    assert len(edges) == len(crawler.edge_src)  # each mutual pair stored once
+    assert edges == {frozenset(pair) for pair in [("root", "a"), ("root", "b"), ("root", "c"),
+                                                   ("a", "b"), ("a", "d"), ("c", "e")]}
+
+def test_crawl_node_limit():
+    crawler = make_crawler(max_depth=5, max_nodes=3)
+    assert crawler.crawl("root") == 3
+
+def test_crawl_survives_fetch_errors():
+    def flaky(user_id):
+        if user_id == "a":
+            raise Exception("API Error")
+        return GRAPH[user_id]
+    crawler = MutualsCrawler(MagicMock(), max_depth=3, fetch_mutuals=flaky)
+    crawler.crawl("root")
+    assert crawler.failures == 1
+    assert "d" not in dict(crawler.edges()).values()
+
+def test_frontier_spills_to_disk(tmp_path):
+    frontier = _Frontier(spill_threshold=4, spill_dir=str(tmp_path))
+    for node in range(10):
+        frontier.append(node)
+    assert frontier._spill_file is not None
+    assert len(frontier) == 10
+    assert list(frontier) == list(range(10))
+    frontier.close()
+
+def test_write_edge_list(tmp_path):
+    crawler = make_crawler(max_depth=1)
+    crawler.crawl("root")
+    path = tmp_path / "edges.tsv"
+    assert crawler.write_edge_list(str(path)) == 3
+    assert path.read_text().splitlines() == ["root\ta", "root\tb", "root\tc"]
+
+def test_crawl_follows_paging_cursor():
+    pages = {
+        ("root", None): {"result": {"data": ["a", "b"], "paging": {"cursor": "p2"}}},
+        ("root", "p2"): {"result": {"data": ["c"], "paging": {}}},
+    }
+    api = MagicMock()
+    api.get_mutuals.side_effect = lambda user_id, max_results, cursor: pages.get((user_id, cursor), {"result": {"data": []}})
+    crawler = MutualsCrawler(api, max_depth=1, page_size=2)
+    assert crawler.crawl("root") == 4
+    assert sorted(dst for _, dst in crawler.edges()) == ["a", "b", "c"]
+    assert crawler.truncated == 0
+
+def test_crawl_counts_truncated_users():
+    api = MagicMock()
+    api.get_mutuals.side_effect = lambda user_id, max_results, cursor: {
+        "result": {"data": [f"{cursor or 0}x"], "paging": {"cursor": (cursor or 0) + 1}}}
+    crawler = MutualsCrawler(api, max_depth=1, max_pages=3)
+    crawler.crawl("root")
+    assert crawler.node_count == 4
+    assert crawler.truncated == 1
@@ -6,6 +6,10 @@ import requests_mock
 from unittest.mock import patch, MagicMock
 import json
 import requests
+import httpx
+import socket
+import threading
+import time
 
 # Test constants
 TEST_USER_ID = "test_user"
@@ -181,3 +185,253 @@ def test_call_api_api_error_field(mock_partiful_api, requests_mock):
 
 #     response = mock_partiful_api.get_mutuals()
 #     assert response['result']['data'] == ["user1", "user2"]
+
+def test_call_api_http2_transport(dummy_profile):
+    """Test call_api sends through the shared httpx client when http2 is enabled."""
+    api = PartifulAPI(default_profile=dummy_profile, auth_token='test_token', http2=True)
+    url = "https://api.partiful.com/testHttp2"
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        return httpx.Response(200, json={"result": "ok"})
+    api._http2_client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    assert api.call_api(url, method="GET") == {"result": "ok"}
+    assert [(request.method, str(request.url)) for request in sent] == [("GET", url)]
+    assert sent[0].headers["Authorization"] == api.headers["Authorization"]
+
+def test_http2_body_read_is_bounded_by_deadline(dummy_profile, monkeypatch):
+    """Test a body still streaming over HTTP/2 when the budget runs out raises DeadlineExceeded."""
+    from partiful_api import DeadlineExceeded
+    now = [1000.0]
+    monkeypatch.setattr("partiful_api.time.monotonic", lambda: now[0])
+
+    class SlowBody(httpx.SyncByteStream):
+        def __iter__(self):
+            for _ in range(5):
+                now[0] += 1.0  # each chunk arrives in time for httpx's per-read timeout
+                yield b'{"result": "ok"}'
+    api = PartifulAPI(default_profile=dummy_profile, auth_token='test_token', http2=True)
+    api._http2_client = httpx.Client(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, headers={"Content-Type": "application/json"}, stream=SlowBody())))
+    with pytest.raises(DeadlineExceeded):
+        api.call_api("https://api.partiful.com/testSlowHttp2", method="GET", timeout=3)
+
+def test_http2_client_reused_and_closed(dummy_profile):
+    """Test the HTTP/2 client is created once and released on close."""
+    with PartifulAPI(default_profile=dummy_profile, auth_token='test_token', http2=True) as api:
+        client = api._get_http2_client()
+        assert api._get_http2_client() is client
+    assert api._http2_client is None
+
+def test_call_api_decodes_and_records_compressed_response(mock_partiful_api, requests_mock):
+    """Test call_api decodes an encoded body itself and records wire vs decoded bytes."""
+    import gzip
+    url = "https://api.partiful.com/getMutuals"
+    body = json.dumps({"result": {"data": ["user"] * 1000}}).encode()
+    requests_mock.get(url, content=gzip.compress(body),
+                      headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+
+    assert mock_partiful_api.call_api(url, method="GET") == json.loads(body)
+    stats = mock_partiful_api.compression_stats.snapshot()["getMutuals"]
+    assert stats["response_bytes"] == len(body)
+    assert stats["response_bytes_wire"] < len(body)
+
+def test_call_api_compresses_large_request_bodies(dummy_profile, sample_datetime, requests_mock):
+    """Test request bodies over the threshold are gzipped and flagged with Content-Encoding."""
+    import gzip
+    api = PartifulAPI(default_profile=dummy_profile, auth_token='test_token', compress_requests_over=100)
+    requests_mock.post(endpoints['create_event'], json={"result": {"data": "test_event_id"}},
+                       headers={"Content-Type": "application/json"})
+    api.create_event(event_name=TEST_EVENT_NAME, event_date=sample_datetime,
+                     max_capacity=TEST_MAX_CAPACITY, description="x" * 1000)
+
+    last_request = requests_mock.last_request
+    assert last_request.headers["Content-Encoding"] == "gzip"
+    sent = json.loads(gzip.decompress(last_request.body))
+    assert sent["data"]["params"]["event"]["title"] == TEST_EVENT_NAME
+    stats = api.compression_stats.snapshot()["createEvent"]
+    assert stats["request_bytes_sent"] < stats["request_bytes"]
+
+def test_get_guests_csv_returns_text(mock_partiful_api, requests_mock):
+    """Test get_guests_csv returns the CSV body rather than parsing JSON."""
+    csv_text = "Name,Status\nAlex,GOING\n"
+    requests_mock.get("https://api.partiful.com/getGuestsCsv", text=csv_text, headers={"Content-Type": "text/csv"})
+    assert mock_partiful_api.get_guests_csv("event123", statuses=["GOING"]) == csv_text
+    assert requests_mock.last_request.qs["statuses"] == ["going"]
+
+def test_get_mutuals_for_other_user(mock_partiful_api, requests_mock):
+    """Test get_mutuals sends the requested user id and page size."""
+    requests_mock.post(endpoints['get_mutuals'], json={"result": {"data": ["user1"]}},
+                       headers={"Content-Type": "application/json"})
+    response = mock_partiful_api.get_mutuals(user_id="other_user", max_results=50)
+
+    assert response['result']['data'] == ["user1"]
+    sent = requests_mock.last_request.json()
+    assert sent['data']['userId'] == "other_user"
+    assert sent['data']['paging']['maxResults'] == 50
+    assert sent['data']['params']['shouldRemoveEventData'] is True
+
+def test_call_api_passes_remaining_budget_as_timeout(dummy_profile, requests_mock):
+    """Test default_timeout reaches the transport and per-call timeouts override it."""
+    url = "https://api.partiful.com/testTimeout"
+    requests_mock.get(url, json={"result": "ok"}, headers={"Content-Type": "application/json"})
+    api = PartifulAPI(default_profile=dummy_profile, auth_token='test_token', default_timeout=30)
+    api.call_api(url, method="GET")
+    assert 29 < requests_mock.last_request.timeout <= 30
+    api.call_api(url, method="GET", timeout=2)
+    assert requests_mock.last_request.timeout <= 2
+
+def test_deadline_scope_caps_and_cancels_calls(mock_partiful_api, requests_mock, monkeypatch):
+    """Test an exhausted api.deadline() scope stops further calls before they are sent."""
+    from partiful_api import DeadlineExceeded
+    url = "https://api.partiful.com/testDeadline"
+    requests_mock.get(url, json={"result": "ok"}, headers={"Content-Type": "application/json"})
+    now = [1000.0]
+    monkeypatch.setattr("partiful_api.time.monotonic", lambda: now[0])
+
+    with mock_partiful_api.deadline(5.0):
+        with mock_partiful_api.deadline(60.0):  # nested scopes can't extend the budget
+            mock_partiful_api.call_api(url, method="GET", timeout=10)
+            assert requests_mock.last_request.timeout == 5.0
+        now[0] += 5.0
+        with pytest.raises(DeadlineExceeded):
+            mock_partiful_api.get_rsvps()
+    assert requests_mock.call_count == 1
+    assert mock_partiful_api._deadline_stack() == []
+
+def test_transport_timeout_raises_deadline_exceeded(mock_partiful_api, requests_mock):
+    """Test transport timeouts surface as DeadlineExceeded."""
+    from partiful_api import DeadlineExceeded
+    url = "https://api.partiful.com/testSlow"
+    requests_mock.get(url, exc=requests.exceptions.ReadTimeout)
+    with pytest.raises(DeadlineExceeded):
+        mock_partiful_api.call_api(url, method="GET", timeout=1)
+
+def test_stalled_body_raises_deadline_exceeded(dummy_profile):
+    """Test a server that sends headers and then stalls mid-body surfaces as DeadlineExceeded."""
+    from partiful_api import DeadlineExceeded
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    release = threading.Event()
+
+    def stall():
+        conn, _ = server.accept()
+        conn.recv(65536)
+        conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 100\r\n\r\n{\"res")
+        release.wait(5)
+        conn.close()
+    threading.Thread(target=stall, daemon=True).start()
+    api = PartifulAPI(default_profile=dummy_profile, auth_token='test_token')
+    start = time.monotonic()
+    try:
+        with pytest.raises(DeadlineExceeded):
+            api.call_api(f"http://127.0.0.1:{server.getsockname()[1]}/stalled", method="GET", timeout=0.5)
+    finally:
+        release.set()
+        server.close()
+    assert time.monotonic() - start < 2
+
+def test_warmup_opens_pooled_session(mock_partiful_api, requests_mock, monkeypatch):
+    """Test warmup resolves the host, opens a keep-alive session and later calls reuse it."""
+    resolved = []
+    monkeypatch.setattr("partiful_api.socket.getaddrinfo", lambda host, port, **kwargs: resolved.append((host, port)))
+    requests_mock.head("https://api.partiful.com/", status_code=404)
+    requests_mock.post(endpoints['get_mutuals'], json={"result": {"data": []}},
+                       headers={"Content-Type": "application/json"})
+
+    metrics = mock_partiful_api.warmup()
+    assert resolved == [("api.partiful.com", 443)]
+    assert metrics['errors'] == [] and metrics['models'] > 0
+    assert 'Authorization' not in requests_mock.last_request.headers
+    session = mock_partiful_api._session
+    assert session is not None
+
+    with patch.object(session, 'post', wraps=session.post) as session_post:
+        mock_partiful_api.get_mutuals()
+    assert session_post.call_count == 1
+    mock_partiful_api.close()
+    assert mock_partiful_api._session is None
+
+def test_warmup_opens_requested_connections_without_cookies(mock_partiful_api):
+    """Test warmup opens `connections` connections at once and the session keeps no cookies."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    ports = []
+
+    class SetsCookie(BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            ports.append(self.client_address[1])
+            time.sleep(0.05)  # overlap the requests, so each needs its own connection
+            self.send_response(404)
+            self.send_header("Set-Cookie", "session=abc; Path=/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SetsCookie)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        metrics = mock_partiful_api.warmup(base_url=f"http://127.0.0.1:{server.server_address[1]}/",
+                                           connections=4, pool_size=3)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert metrics['errors'] == [] and metrics['connections'] == 3
+    assert len(set(ports)) == 3
+    assert len(mock_partiful_api._session.cookies) == 0
+    mock_partiful_api.close()
+
+def test_warmup_reports_failures_without_raising(mock_partiful_api, requests_mock, monkeypatch):
+    """Test an unreachable host during warmup is logged and reported, not raised."""
+    def no_dns(*args, **kwargs):
+        raise OSError("no network")
+    monkeypatch.setattr("partiful_api.socket.getaddrinfo", no_dns)
+    requests_mock.head("https://api.partiful.com/", exc=requests.exceptions.ConnectionError)
+    metrics = mock_partiful_api.warmup()
+    assert [error.split(':')[0] for error in metrics['errors']] == ['dns', 'connect']
+
+def test_client_state_round_trip(monkeypatch):
+    """Test a client state snapshot is JSON-serialisable and rebuilds an equivalent, warmed client."""
+    from Partiful_Types import partiful_profile
+    api = PartifulAPI(partiful_profile(name='worker', user_id='u1'), 'test_token', local_timezone='Europe/Berlin',
+                      http2=True, default_timeout=12)
+    api.warmup_metrics = {}
+    state = json.loads(json.dumps(api.client_state()))
+
+    warmed = []
+    monkeypatch.setattr(PartifulAPI, "warmup", lambda self, **kwargs: warmed.append(kwargs))
+    restored = PartifulAPI.from_state(state, connect=False)
+    assert warmed == [{'connect': False}]
+    assert (restored.user_id, restored.auth_token, restored.timezone.key) == ('u1', 'test_token', 'Europe/Berlin')
+    assert restored.http2 and restored.default_timeout == 12
+    assert restored.client_state() == {**state, 'warm': False}
+
+def test_http2_client_created_once_under_concurrency(dummy_profile, monkeypatch):
+    """Test concurrent first calls share one lazily created HTTP/2 client."""
+    import threading
+    import time
+    created = []
+
+    def slow_client(**kwargs):
+        time.sleep(0.01)  # widen the race window
+        client = MagicMock()
+        created.append(client)
+        return client
+    monkeypatch.setattr("partiful_api.httpx.Client", slow_client)
+    api = PartifulAPI(default_profile=dummy_profile, auth_token='test_token', http2=True)
+    barrier = threading.Barrier(50)
+    clients = []
+
+    def first_call():
+        barrier.wait()
+        clients.append(api._get_http2_client())
+    threads = [threading.Thread(target=first_call) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(client is created[0] for client in clients)
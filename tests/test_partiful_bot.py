@@ -1,8 +1,10 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from partiful_bot import PartifulBot, partiful_profile
+from debug_artifacts import ArtifactWriter
 from selenium.common.exceptions import ElementClickInterceptedException, TimeoutException
 import logging
+import time
 
 # Disable pytest logging to prevent log file creation during tests
 logging.getLogger().handlers.clear()
@@ -12,8 +14,8 @@ def fake_profile():
     return partiful_profile(name='Test User', user_id='abc123')
 
 @pytest.fixture
-def bot_fixture(fake_profile):
-    """Fixture to create a PartifulBot instance."""
+def bot_fixture(fake_profile, tmp_path):
+    """Fixture to create a PartifulBot instance, keeping its debug artifacts in tmp_path."""
     # Mock the ChromeDriverManager and Chrome
     mock_driver = MagicMock()
     mock_driver.current_url = "https://partiful.com/login"
@@ -21,8 +23,10 @@ def bot_fixture(fake_profile):
 
     with patch("partiful_bot.ChromeDriverManager.install", return_value=mock_driver), \
          patch("partiful_bot.Chrome", return_value=mock_driver):
-        bot = PartifulBot(phone_number="5551234567", default_profile=fake_profile)
+        bot = PartifulBot(phone_number="5551234567", default_profile=fake_profile,
+                          artifacts=ArtifactWriter(root=str(tmp_path / "logs")))
         yield bot, mock_driver
+        bot._artifacts.flush()
 
 @patch("partiful_bot.ChromeDriverManager.install")
 @patch("partiful_bot.Chrome")
@@ -82,7 +86,8 @@ def test_login_success(
     mock_sleep,
     mock_uniform,
     mock_webdriver_wait,
-    bot_fixture
+    bot_fixture,
+    tmp_path
 ):
     bot, mock_driver = bot_fixture
     mock_get_verification_code.return_value = "123456"
@@ -106,8 +111,12 @@ def test_login_success(
     ]
 
     bot._bearer_token = "token"  # Simulate token found
+    bot._artifacts.debug = True  # debug runs keep a screenshot of the logged-in page
+    mock_driver.get_screenshot_as_png.return_value = b"png"
 
     bot.login()
+    bot._artifacts.flush()
+    assert len(list((tmp_path / "logs" / "screenshots").iterdir())) == 1
 
     mock_driver.get.assert_called_once_with('https://partiful.com/login')
     mock_phone_input.send_keys.assert_called_once_with(bot.phone_number)
@@ -173,3 +182,72 @@ def test_exit(mock_setup_driver):
         pass
 
     mock_driver.quit.assert_called_once()
+
+def test_screenshot_only_kept_on_failure_or_debug(bot_fixture):
+    """Successful-path screenshots are skipped unless debug artifacts are enabled."""
+    bot, mock_driver = bot_fixture
+    bot._artifacts = MagicMock()
+    bot._artifacts.wants.return_value = False
+    bot._save_driver_screenshot(failure=False)
+    mock_driver.get_screenshot_as_png.assert_not_called()
+
+    bot._artifacts.wants.return_value = True
+    bot._save_driver_screenshot()
+    bot._artifacts.save_bytes.assert_called_once_with(
+        'screenshots', mock_driver.get_screenshot_as_png.return_value, '.png', failure=True)
+
+def test_setup_driver_lean_browser(bot_fixture):
+    """Lean mode uses a smaller viewport and blocks non-essential resources via CDP."""
+    from partiful_bot import LEAN_BLOCKED_URLS
+    bot, mock_driver = bot_fixture
+    bot.lean_browser = True
+    with patch("partiful_bot.Chrome", return_value=mock_driver) as mock_chrome:
+        bot._setup_driver()
+    arguments = mock_chrome.call_args.kwargs["options"].arguments
+    assert "--window-size=1024,768" in arguments
+    assert "--window-size=1920,1080" not in arguments
+    mock_driver.execute_cdp_cmd.assert_any_call('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+
+def test_process_tree_rss():
+    import os
+    from partiful_bot import _process_tree_rss
+    if not os.path.isdir('/proc'):
+        pytest.skip("needs /proc")
+    assert _process_tree_rss(os.getpid()) > 0
+    assert _process_tree_rss(None) is None
+
+def test_rss_sampler_catches_peak_between_phases():
+    """The sampler runs during the login, so a spike that is gone by the next phase still counts."""
+    import os
+    from partiful_bot import _RssSampler, _process_tree_rss
+    if not os.path.isdir('/proc'):
+        pytest.skip("needs /proc")
+    before = _process_tree_rss(os.getpid())
+    sampler = _RssSampler(os.getpid(), interval=0.01).start()
+    spike = b"x" * (64 * 2**20)
+    time.sleep(0.1)
+    del spike
+    sampler.stop()
+    assert sampler.peak >= before + 48 * 2**20
+    assert _RssSampler(None).start().peak is None
+
+def test_failed_login_writes_driver_logs_once(bot_fixture, tmp_path):
+    """With debug artifacts on, a failed login keeps one copy of the driver logs."""
+    bot, mock_driver = bot_fixture
+    bot._artifacts.debug = True
+    mock_driver.get_log.return_value = [{"message": '{"message": {"method": "Network.requestWillBeSent"}}'}]
+    mock_driver.get_screenshot_as_png.return_value = b"png"
+    bot._store_driver_logs()
+    bot._save_failure_artifacts()
+    bot._artifacts.flush()
+    assert len(list((tmp_path / "logs" / "driver_logs").iterdir())) == 1
+    assert len(list((tmp_path / "logs" / "screenshots").iterdir())) == 1
+
+def test_failure_artifacts_are_on_disk_when_save_returns(bot_fixture, tmp_path):
+    """Failure artifacts are flushed before the login error propagates and the process can exit."""
+    bot, mock_driver = bot_fixture
+    mock_driver.get_screenshot_as_png.return_value = b"png"
+    bot._driver_logs = [{"method": "Network.requestWillBeSent"}]
+    bot._driver_logs_saved = False
+    bot._save_failure_artifacts()
+    assert len(list((tmp_path / "logs" / "driver_logs").iterdir())) == 1
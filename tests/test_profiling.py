@@ -0,0 +1,94 @@
+import json
+import os
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+import profiling
+from partiful_api import PartifulAPI
+
+
+@pytest.fixture
+def api():
+    fake_profile = MagicMock()
+    fake_profile.user_id = 'test_user'
+    return PartifulAPI(default_profile=fake_profile, auth_token='test_token')
+
+
+def test_section_is_noop_outside_a_run():
+    """Test sections cost nothing and record nothing when no run is active."""
+    assert profiling._active is None
+    with profiling.section('anything') as section:
+        assert section is None
+
+
+def test_unsampled_run_is_not_profiled(tmp_path, monkeypatch):
+    """Test rate 0 (PARTIFUL_PROFILE unset) never starts a run."""
+    monkeypatch.delenv(profiling.PROFILE_ENV_VAR, raising=False)
+    with profiling.profile_run('batch', output_dir=str(tmp_path)) as run:
+        assert run is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_sample_run_reports_tagged_sections_and_memory(tmp_path):
+    """Test a sampled run writes a JSON report with per-tag timings, samples and allocations."""
+    with profiling.profile_run('batch', rate=1.0, mode='sample', memory=True,
+                               output_dir=str(tmp_path), interval=0.002) as run:
+        with profiling.section('json:getMutuals'):
+            payload = [str(i) * 10 for i in range(20000)]
+            time.sleep(0.05)
+        with profiling.section('json:getMutuals'):
+            pass
+    assert profiling._active is None
+    with open(run.report_path) as report_file:
+        report = json.load(report_file)
+    assert report['sections']['json:getMutuals']['count'] == 2
+    assert report['sections']['json:getMutuals']['total_s'] >= 0.05
+    assert report['sections']['json:getMutuals']['net_bytes'] > 0
+    assert report['samples']['by_tag'].get('json:getMutuals', 0) > 0
+    assert report['top_allocations']
+    assert os.path.exists(run.report_path.replace('.json', '.collapsed'))
+    del payload
+
+
+def test_cprofile_run_reports_top_functions(tmp_path):
+    """Test cprofile mode dumps pstats and lists the top functions."""
+    with profiling.profile_run('batch', rate=1.0, mode='cprofile', memory=False, output_dir=str(tmp_path)) as run:
+        sorted(range(10000), key=lambda x: -x)
+    with open(run.report_path) as report_file:
+        report = json.load(report_file)
+    assert report['top_functions']
+    assert 'top_allocations' not in report
+    assert os.path.exists(run.report_path.replace('.json', '.pstats'))
+
+
+def test_nested_run_joins_outer_run(tmp_path):
+    """Test a run opened inside another records into the outer run."""
+    with profiling.profile_run('outer', rate=1.0, memory=False, output_dir=str(tmp_path)) as outer:
+        with profiling.profile_run('inner', rate=1.0, memory=False, output_dir=str(tmp_path)) as inner:
+            assert inner is None
+            with profiling.section('inner_work'):
+                pass
+    assert 'inner_work' in outer.sections
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.json')]) == 1
+
+
+def test_phases_close_previous_phase(tmp_path):
+    """Test Phases times consecutive steps of a flow under prefix:step."""
+    with profiling.profile_run('login', rate=1.0, memory=False, output_dir=str(tmp_path)) as run:
+        phases = profiling.Phases('login')
+        phases.next('page_load')
+        phases.next('phone_number')
+        phases.end()
+    assert set(run.sections) == {'login:page_load', 'login:phone_number'}
+
+
+def test_call_api_sections_per_endpoint(api, tmp_path, requests_mock):
+    """Test call_api tags pydantic building, the HTTP send and JSON parsing per endpoint."""
+    requests_mock.post("https://api.partiful.com/getMutuals", json={"result": {"data": []}},
+                       headers={"Content-Type": "application/json"})
+    with profiling.profile_run('mutuals', rate=1.0, memory=False, output_dir=str(tmp_path)) as run:
+        api.get_mutuals()
+    assert {'pydantic.build:getMutuals', 'pydantic.dump:getMutuals', 'http:getMutuals',
+            'json:getMutuals'} <= set(run.sections)
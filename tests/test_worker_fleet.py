@@ -0,0 +1,45 @@
+import os
+import time
+from multiprocessing import Process
+from unittest.mock import MagicMock
+from worker_fleet import FileTokenBucket, run_fleet, summarize
+
+def fake_api_factory():
+    api = MagicMock()
+    api.get_rsvps.return_value = {"result": {"data": [os.getpid()]}}
+    api.get_mutuals.side_effect = Exception("API Error: boom")
+    return api
+
+def drain_bucket(path, tokens):
+    bucket = FileTokenBucket(path, rate=50, capacity=5)
+    for _ in range(tokens):
+        bucket.acquire()
+
+def test_token_bucket_burst_then_rate(tmp_path):
+    bucket = FileTokenBucket(str(tmp_path / "budget"), rate=100, capacity=3)
+    assert sum(bucket.acquire() for _ in range(3)) < 0.05
+    assert bucket.acquire() > 0.0
+
+def test_token_bucket_shared_across_processes(tmp_path):
+    path = str(tmp_path / "budget")
+    start = time.monotonic()
+    workers = [Process(target=drain_bucket, args=(path, 10)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    # 30 tokens with a burst of 5 at 50/s needs at least 0.5s in total, not per process
+    assert time.monotonic() - start >= 0.45
+
+def test_run_fleet_aggregates_results(tmp_path):
+    jobs = [{"id": str(i), "op": "get_rsvps"} for i in range(12)] + [{"id": "bad", "op": "get_mutuals"}]
+    results, metrics = run_fleet(jobs, fake_api_factory, processes=2, rate=1000,
+                                 budget_path=str(tmp_path / "budget"), chunksize=2)
+    assert [r["id"] for r in results] == [job["id"] for job in jobs]
+    assert metrics["ok"] == 12 and metrics["failed"] == 1
+    assert metrics["by_op"] == {"get_rsvps": 12, "get_mutuals": 1}
+    assert os.getpid() not in metrics["by_process"]
+    assert results[0]["result"]["result"]["data"] == [results[0]["pid"]]
+
+def test_summarize_empty():
+    assert summarize([], 0)["jobs"] == 0
@@ -0,0 +1,156 @@
+"""
+Run PartifulAPI jobs across a pool of worker processes, so JSON/pydantic work is not
+serialised on one GIL, while every process draws from one shared request budget.
+
+The budget is a token bucket kept in a small state file and updated under an
+exclusive flock, so it is shared by every process on the machine that uses the same
+path (Unix only). Jobs use the job_runner format ({"op": ..., "args": {...}}).
+
+Usage:
+    results, metrics = run_fleet(jobs, api_factory=partial(default_api_factory, token, user_id),
+                                 processes=4, rate=5.0)
+"""
+import fcntl
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from statistics import median
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import profiling
+from Partiful_Types import partiful_profile
+from job_runner import run_job
+from partiful_api import PartifulAPI
+
+
+class FileTokenBucket:
+    def __init__(self, path: str, rate: float, capacity: float = None):
+        """
+        :param path: state file shared by all processes drawing from this budget
+        :param rate: tokens (requests) added per second
+        :param capacity: burst size, defaults to one second of tokens
+        """
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+
+    def _locked(self, fn):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            return fn(fd)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _take(self, fd: int, tokens: float) -> float:
+        """Take tokens if available. Returns 0 on success, else seconds until they will be."""
+        now = time.time()
+        raw = os.pread(fd, 64, 0).decode().split()
+        level, updated = (float(raw[0]), float(raw[1])) if len(raw) == 2 else (self.capacity, now)
+        level = min(self.capacity, level + max(0.0, now - updated) * self.rate)
+        wait = 0.0
+        if level >= tokens:
+            level -= tokens
+        else:
+            wait = (tokens - level) / self.rate
+        state = f"{level:.6f} {now:.6f}".encode()
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, state, 0)
+        return wait
+
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> float:
+        """Block until tokens are granted. Returns seconds spent waiting."""
+        start = time.monotonic()
+        while True:
+            wait = self._locked(lambda fd: self._take(fd, tokens))
+            if wait == 0:
+                return time.monotonic() - start
+            if timeout is not None and time.monotonic() - start + wait > timeout:
+                raise TimeoutError(f"Rate budget {self.path} had no capacity within {timeout}s")
+            time.sleep(wait)
+
+
+def default_api_factory(auth_token: str, user_id: str, local_timezone: str = 'America/Los_Angeles',
+                        http2: bool = False) -> PartifulAPI:
+    return PartifulAPI(partiful_profile(name='worker', user_id=user_id), auth_token,
+                       local_timezone=local_timezone, http2=http2)
+
+
+# Per-process state, set up once by _init_worker
+_worker_api = None
+_worker_bucket = None
+
+
+def _init_worker(api_factory: Callable[[], PartifulAPI], bucket: FileTokenBucket):
+    global _worker_api, _worker_bucket
+    _worker_api = api_factory()
+    _worker_bucket = bucket
+
+
+def _run_in_worker(indexed_job: Tuple[int, Dict[str, Any]]) -> Dict[str, Any]:
+    index, job = indexed_job
+    result = {'index': index, 'id': job.get('id'), 'op': job.get('op'), 'ok': False, 'result': None,
+              'error': None, 'pid': os.getpid()}
+    result['throttle_wait_s'] = _worker_bucket.acquire()
+    start = time.perf_counter()
+    try:
+        # PARTIFUL_PROFILE set in the parent samples this fraction of jobs in every worker
+        with profiling.profile_run(f"fleet_{job.get('op')}"):
+            result['result'] = run_job(_worker_api, job)
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['elapsed_s'] = time.perf_counter() - start
+    return result
+
+
+def summarize(results: List[Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+    """Aggregate per-job results into fleet metrics."""
+    latencies = sorted(r['elapsed_s'] for r in results)
+    return {
+        'jobs': len(results),
+        'ok': sum(r['ok'] for r in results),
+        'failed': sum(not r['ok'] for r in results),
+        'wall_s': round(wall_s, 3),
+        'jobs_per_s': round(len(results) / wall_s, 2) if wall_s else None,
+        'latency_p50_s': round(median(latencies), 4) if latencies else None,
+        'latency_p95_s': round(latencies[int(len(latencies) * 0.95) - 1], 4) if latencies else None,
+        'throttle_wait_s': round(sum(r['throttle_wait_s'] for r in results), 3),
+        'by_op': dict(Counter(r['op'] for r in results)),
+        'by_process': dict(Counter(r['pid'] for r in results)),
+    }
+
+
+def run_fleet(jobs: Iterable[Dict[str, Any]],
+              api_factory: Callable[[], PartifulAPI],
+              processes: int = 4,
+              rate: float = 5.0,
+              burst: float = None,
+              budget_path: str = None,
+              chunksize: int = 8,
+              ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Run jobs on a process pool under a shared request budget.
+
+    :param api_factory: picklable callable building each worker's PartifulAPI,
+        e.g. partial(default_api_factory, auth_token, user_id)
+    :param rate: requests per second allowed across all workers (and any other
+        process using the same budget_path)
+    :param burst: bucket capacity, defaults to one second of requests
+    :param budget_path: token bucket state file. Share it between fleets to share one budget
+    :param chunksize: jobs handed to a worker at a time
+    :return: (per-job results in input order, aggregated metrics)
+    """
+    budget_path = budget_path or os.path.join(tempfile.gettempdir(), 'partiful_rate_budget')
+    bucket = FileTokenBucket(budget_path, rate, burst)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(api_factory, bucket)) as pool:
+        results = list(pool.map(_run_in_worker, enumerate(jobs), chunksize=chunksize))
+    metrics = summarize(results, time.perf_counter() - start)
+    logging.info(f"Fleet finished: {metrics}")
+    return results, metrics